@@ -0,0 +1,327 @@
+"""
+Vectorized batch re-scoring of archived tracing sessions.
+
+Traces are packed into one ragged array (concatenated samples plus a trace id
+per sample) so every metric is a handful of NumPy operations over all traces
+of a chunk at once. Chunks are scored in a process pool and the results are
+written as one columnar file (.npz or .csv), one row per (session, spiral).
+
+The tremor columns are a whole-trace estimate (see TREMOR_METHOD), not the
+live TremorAnalyzer readout, which covers the last 2 s window and restarts
+after dropouts; the two agree on steady tremor but are not interchangeable.
+
+Usage:
+    python batch_scoring.py sessions/*.tlog -o scores.npz --workers 4
+"""
+import argparse
+import csv
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from game_state import GameState
+from session_log import read_session, session_reverse_tracings, session_tracing_steps
+from spiral import Spiral
+
+FLOAT_COLUMNS = [
+    "deviation_mean", "deviation_rms", "deviation_max",
+    "path_length_ratio", "radial_velocity_cv", "angular_velocity_cv",
+    "tremor_frequency", "tremor_amplitude", "tremor_band_power",
+    "completion_time", "progress",
+]
+
+# stored with .npz results and printed by the CLI, so scores are not mistaken for live readouts
+TREMOR_METHOD = ("whole-trace spectrum; dropouts are interpolated linearly "
+                 "(TremorAnalyzer: sliding window, restarts after gaps over max_gap)")
+
+
+def _ragged(traces):
+    """Concatenate (N_i, 3+) traces; returns (samples, trace id per sample, lengths)."""
+    lengths = np.array([len(trace) for trace in traces], dtype=np.int64)
+    samples = (np.concatenate([np.asarray(trace, dtype=np.float64)[:, :3] for trace in traces])
+               if lengths.sum() else np.zeros((0, 3)))
+    trace_id = np.repeat(np.arange(len(traces)), lengths)
+    return samples, trace_id, lengths
+
+
+def _per_trace_mean(values, trace_id, count, k):
+    total = np.bincount(trace_id, weights=values, minlength=k)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return total / count
+
+
+def _coefficient_of_variation(values, trace_id, k):
+    count = np.bincount(trace_id, minlength=k).astype(np.float64)
+    mean = _per_trace_mean(values, trace_id, count, k)
+    mean_abs = _per_trace_mean(np.abs(values), trace_id, count, k)
+    var = _per_trace_mean(values ** 2, trace_id, count, k) - mean ** 2
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.sqrt(np.maximum(var, 0.0)) / mean_abs
+
+
+def _tremor_spectrum(samples, trace_id, lengths, sample_rate, band, freq_step=0.05):
+    """
+    Whole-trace tremor estimate for every trace.
+
+    Each trace is resampled onto a uniform grid, differenced, Hann-windowed
+    over its own length and zero-padded to the longest trace; the spectrum is
+    evaluated every freq_step Hz across the band. The scaling follows
+    TremorAnalyzer, but unlike it the window is the whole trace rather than
+    the last window_seconds, and detection dropouts are interpolated across
+    instead of restarting the estimate, so long gaps bias it towards low
+    frequencies.
+    """
+    k = len(lengths)
+    frequency = np.full(k, np.nan)
+    amplitude = np.full(k, np.nan)
+    band_power = np.full(k, np.nan)
+    if not len(samples):
+        return frequency, amplitude, band_power
+
+    t = samples[:, 0]
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    has = lengths > 0
+    t0 = np.zeros(k)
+    t1 = np.zeros(k)
+    t0[has] = t[starts[has]]
+    t1[has] = t[starts[has] + lengths[has] - 1]
+    uniform_len = np.where(has, np.floor((t1 - t0) * sample_rate).astype(np.int64) + 1, 0)
+
+    # one global interpolation: offset each trace's times so they never overlap
+    stride = float(np.max(t1 - t0)) + 1.0
+    shift = np.arange(k) * stride - t0
+    t_global = t + shift[trace_id]
+    u_id = np.repeat(np.arange(k), uniform_len)
+    u_pos = np.arange(len(u_id)) - np.repeat(np.cumsum(uniform_len) - uniform_len, uniform_len)
+    u_global = u_id * stride + u_pos / sample_rate
+    ux = np.interp(u_global, t_global, samples[:, 1])
+    uy = np.interp(u_global, t_global, samples[:, 2])
+
+    # velocity, dropping the first uniform sample of every trace
+    n = uniform_len - 1
+    keep = u_pos > 0
+    vx = np.diff(ux, prepend=0.0)[keep]
+    vy = np.diff(uy, prepend=0.0)[keep]
+    v_id = u_id[keep]
+    v_pos = u_pos[keep] - 1
+    valid = n >= 8
+    if not valid.any():
+        return frequency, amplitude, band_power
+
+    # DTFT on a fixed frequency grid over the band: zero padding adds nothing,
+    # so a trace scores the same whichever chunk it is packed into
+    freqs = np.arange(band[0], band[1] + freq_step / 2, freq_step)
+    freqs = freqs[(freqs > 0) & (freqs < sample_rate / 2)]
+    if not len(freqs):
+        return frequency, amplitude, band_power
+    width = int(n.max())
+    hann = 0.5 - 0.5 * np.cos(2.0 * np.pi * v_pos / np.maximum(n[v_id], 1))
+    padded = np.zeros((k, 2, width))
+    padded[v_id, 0, v_pos] = vx * hann
+    padded[v_id, 1, v_pos] = vy * hann
+    basis = np.exp(-2j * np.pi * np.outer(np.arange(width), freqs) / sample_rate)
+    spectrum = padded @ basis
+    vel_to_pos = 1.0 / (2.0 * np.sin(np.pi * freqs / sample_rate))
+    power = (np.abs(spectrum) ** 2).sum(axis=1) * vel_to_pos ** 2
+
+    n_valid = n[valid].astype(np.float64)
+    # Parseval over the band, same scaling as TremorAnalyzer.result()
+    band_power[valid] = power[valid].sum(axis=1) * freq_step * 16.0 / (3.0 * n_valid * sample_rate)
+    valid_power = power[valid]
+    peak = valid_power.argmax(axis=1)
+    rows = np.arange(len(peak))
+    # parabolic interpolation between neighbouring grid points (edge peaks stay put)
+    inner = (peak > 0) & (peak < len(freqs) - 1)
+    left = np.sqrt(valid_power[rows, np.maximum(peak - 1, 0)])
+    mid = np.sqrt(valid_power[rows, peak])
+    right = np.sqrt(valid_power[rows, np.minimum(peak + 1, len(freqs) - 1)])
+    denom = left - 2.0 * mid + right
+    with np.errstate(invalid="ignore", divide="ignore"):
+        offset = np.where(inner & (denom != 0), 0.5 * (left - right) / denom, 0.0)
+    frequency[valid] = freqs[peak] + offset * freq_step
+    amplitude[valid] = 4.0 * mid / n_valid
+    return frequency, amplitude, band_power
+
+
+def score_traces(traces, spiral, sample_rate=60.0, band=(3.0, 12.0), reverse=False):
+    """
+    Score many traces of one spiral at once.
+
+    Args:
+        traces: list of (N_i, 3) arrays of (t, x, y) samples; lengths may differ
+        spiral: Spiral the traces were drawn on
+        sample_rate: uniform resampling rate for the tremor spectrum, Hz
+        band: (low, high) tremor band, Hz
+        reverse: the traces run from the outer end to the centre; progress is
+            then measured from the outer end (1 - the smallest arc-length fraction)
+
+    Returns:
+        dict column name -> array with one value per trace (NaN where undefined)
+    """
+    samples, trace_id, lengths = _ragged(traces)
+    k = len(traces)
+    count = lengths.astype(np.float64)
+    t, xy = samples[:, 0], samples[:, 1:3]
+
+    if len(samples):
+        distance, progress = spiral.nearest_on_path(xy)
+    else:
+        distance = progress = np.zeros(0)
+    deviation_max = np.full(k, np.nan)
+    progress_max = np.full(k, np.nan)
+    if len(samples):
+        deviation_max[lengths > 0] = -np.inf
+        progress_max[lengths > 0] = -np.inf
+        np.maximum.at(deviation_max, trace_id, distance)
+        # furthest point reached along the tracing direction
+        np.maximum.at(progress_max, trace_id, 1.0 - progress if reverse else progress)
+
+    # consecutive-sample differences, masked where a new trace starts
+    same = np.zeros(len(samples), dtype=bool)
+    same[1:] = trace_id[1:] == trace_id[:-1]
+    step_id = trace_id[same]
+    dt = np.diff(t, prepend=0.0)[same]
+    dxy = np.diff(xy, axis=0, prepend=np.zeros((1, 2)))[same]
+
+    path = spiral.path_array.astype(np.float64)
+    spiral_length = np.hypot(*np.diff(path, axis=0).T).sum()
+    trace_length = np.bincount(step_id, weights=np.hypot(dxy[:, 0], dxy[:, 1]), minlength=k)
+
+    rel = xy - np.asarray(spiral.center, dtype=np.float64)
+    radius = np.hypot(rel[:, 0], rel[:, 1])
+    angle = np.arctan2(rel[:, 1], rel[:, 0])
+    dr = np.diff(radius, prepend=0.0)[same]
+    dtheta = (np.diff(angle, prepend=0.0)[same] + np.pi) % (2.0 * np.pi) - np.pi
+    moving = dt > 0
+    radial_cv = _coefficient_of_variation(dr[moving] / dt[moving], step_id[moving], k)
+    angular_cv = _coefficient_of_variation(dtheta[moving] / dt[moving], step_id[moving], k)
+
+    frequency, amplitude, band_power = _tremor_spectrum(samples, trace_id, lengths, sample_rate, band)
+    duration = np.bincount(step_id, weights=dt, minlength=k)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {
+            "samples": lengths,
+            "deviation_mean": _per_trace_mean(distance, trace_id, count, k),
+            "deviation_rms": np.sqrt(_per_trace_mean(distance ** 2, trace_id, count, k)),
+            "deviation_max": deviation_max,
+            "path_length_ratio": trace_length / spiral_length,
+            "radial_velocity_cv": radial_cv,
+            "angular_velocity_cv": angular_cv,
+            "tremor_frequency": frequency,
+            "tremor_amplitude": amplitude,
+            "tremor_band_power": band_power,
+            "completion_time": np.where(lengths > 0, duration, np.nan),
+            "progress": progress_max,
+        }
+
+
+def load_session_traces(paths):
+    """
+    Tracing samples of every session log.
+
+    Returns:
+        list of (session path, spiral name, spiral spec, (N, 3) t/x/y array,
+        True for a reverse tracing)
+    """
+    jobs = []
+    for path in paths:
+        metadata, records = read_session(path)
+        specs = metadata.get("spirals", {})
+        reverse = session_reverse_tracings(metadata)
+        for step, name in session_tracing_steps(metadata).items():
+            if name not in specs:
+                continue
+            rows = records[(records["step"] == step) & (records["state"] == GameState.TRACING)]
+            rows = rows[~np.isnan(rows["x"])]
+            trace = np.column_stack((rows["t"], rows["x"], rows["y"])).astype(np.float64)
+            jobs.append((path, name, specs[name], trace, name in reverse))
+    return jobs
+
+
+def _score_chunk(spec, traces, reverse, sample_rate, band):
+    return score_traces(traces, Spiral(**spec), sample_rate, band, reverse)
+
+
+def score_sessions(paths, workers=None, chunk_size=64, sample_rate=60.0, band=(3.0, 12.0)):
+    """
+    Score every tracing of every session log, chunked over a process pool.
+
+    Args:
+        paths: session .tlog files
+        workers: pool size (None = CPU count, 0 = score in this process)
+        chunk_size: traces per pool task; traces of one chunk share a spiral
+
+    Returns:
+        dict column name -> array, one row per (session, spiral)
+    """
+    return score_jobs(load_session_traces(paths), workers, chunk_size, sample_rate, band)
+
+
+def score_jobs(jobs, workers=None, chunk_size=64, sample_rate=60.0, band=(3.0, 12.0)):
+    """score_sessions() for tracings already loaded with load_session_traces()."""
+    # chunks only mix traces of identical spiral geometry and direction
+    groups = {}
+    for row, (_, _, spec, _, reverse) in enumerate(jobs):
+        key = (tuple(sorted((key, str(value)) for key, value in spec.items())), reverse)
+        groups.setdefault(key, []).append(row)
+    chunks = []
+    for (_, reverse), rows in groups.items():
+        for i in range(0, len(rows), chunk_size):
+            chunk_rows = rows[i:i + chunk_size]
+            chunks.append((chunk_rows, jobs[chunk_rows[0]][2], [jobs[r][3] for r in chunk_rows], reverse))
+
+    columns = {"session": np.array([os.path.basename(job[0]) for job in jobs]),
+               "spiral": np.array([job[1] for job in jobs]),
+               "samples": np.zeros(len(jobs), dtype=np.int64)}
+    columns.update({name: np.full(len(jobs), np.nan) for name in FLOAT_COLUMNS})
+
+    if workers == 0:
+        results = [_score_chunk(spec, traces, reverse, sample_rate, band) for _, spec, traces, reverse in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn")) as pool:
+            futures = [pool.submit(_score_chunk, spec, traces, reverse, sample_rate, band)
+                       for _, spec, traces, reverse in chunks]
+            results = [future.result() for future in futures]
+    for (rows, _, _, _), result in zip(chunks, results):
+        for name, values in result.items():
+            columns[name][rows] = values
+    return columns
+
+
+def write_results(path, columns):
+    """Write the score columns as .npz (one array per column, plus tremor_method) or .csv."""
+    if path.endswith(".csv"):
+        names = list(columns)
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(names)
+            writer.writerows(zip(*(columns[name].tolist() for name in names)))
+    else:
+        np.savez(path, tremor_method=np.array(TREMOR_METHOD), **columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch re-score archived tracing sessions")
+    parser.add_argument("sessions", nargs="+", help="session .tlog files")
+    parser.add_argument("-o", "--output", default="scores.npz", help=".npz or .csv results file")
+    parser.add_argument("--workers", type=int, default=None, help="pool size, 0 = no pool")
+    parser.add_argument("--chunk-size", type=int, default=64)
+    args = parser.parse_args()
+
+    tremor_cfg = {}
+    if os.path.exists("config.yaml"):
+        from config_loader import load_config
+        tremor_cfg = load_config("config.yaml").get("tremor", {})
+    columns = score_sessions(args.sessions, workers=args.workers, chunk_size=args.chunk_size,
+                             sample_rate=tremor_cfg.get("sample_rate", 60.0),
+                             band=tuple(tremor_cfg.get("band", (3.0, 12.0))))
+    write_results(args.output, columns)
+    print(f"Scored {len(columns['session'])} tracings from {len(args.sessions)} sessions -> {args.output}")
+    print(f"Tremor columns: {TREMOR_METHOD}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Micro-benchmarks for the hot paths, runnable without a camera or display.
+
+Each benchmark reports the median seconds per call of several cases. Results
+can be saved as a JSON baseline; a later run compared against it fails (exit
+code 1) when any case is slower than the baseline by more than --threshold.
+
+Usage:
+    python benchmark_suite.py --save-baseline bench_baseline.json
+    python benchmark_suite.py --baseline bench_baseline.json --threshold 0.25
+    python benchmark_suite.py --only spiral renderer --video recording.mp4
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from camera_manager import CameraManager
+from renderer import Renderer
+from spiral import Spiral
+from trace_manager import TraceManager
+
+
+def measure(fn, repeat=5, min_time=0.05):
+    """Median seconds per call of fn(), over repeat batches of at least min_time each."""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2
+    times = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+    return float(np.median(times))
+
+
+def bench_spiral(args):
+    results = {}
+    for num_points in (250, 500, 1000, 2000, 4000):
+        for turns in (2, 4, 8):
+            spiral = Spiral(outer_radius=200, turns=turns, num_points=num_points)
+            results[f"generate_path n={num_points} turns={turns}"] = measure(spiral._generate_path)
+    return results
+
+
+def bench_renderer(args):
+    """Per-frame cost of the live compositor path with a trace of each length already drawn."""
+    results = {}
+    spiral = Spiral(center=(320, 240), outer_radius=200)
+    circles = (((320, 240), 50, (0, 255, 255)),)
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    rng = np.random.default_rng(0)
+    extra = 20000  # points appended during the measurement, one per frame
+    for length in (100, 1000, 10000, 50000):
+        points = np.cumsum(rng.normal(0, 2, (length + extra, 2)), axis=0).astype(np.int32) + (320, 240)
+        for label, colors in (("steady", ("green",)), ("depth flicker", ("green", "red", "blue"))):
+            renderer = Renderer()
+            state = {"n": length, "generation": 0}
+
+            def render_frame():
+                n = state["n"] + 1
+                if n > len(points):
+                    n = length  # start over as a new trace (rare full redraw)
+                    state["generation"] += 1
+                state["n"] = n
+                renderer.set_scene(frame, spiral, finger_depth_color=colors[n % len(colors)],
+                                   text="Follow the blue dot", circles=circles)
+                renderer.update_trace(points[:n], state["generation"])
+                renderer.compose(frame)
+
+            render_frame()  # draws the existing trace once, as the game would have by now
+            results[f"frame len={length} {label}"] = measure(render_frame)
+    return results
+
+
+def bench_trace(args):
+    results = {}
+    for min_display_distance in (0.0, 2.0):
+        def append(count=10000):
+            trace = TraceManager(min_display_distance=min_display_distance)
+            for i in range(count):
+                trace.update_trace((i % 640, i % 480, 0.5), t=i / 60.0)
+        results[f"update_trace x10000 gate={min_display_distance}"] = measure(append, repeat=3)
+    return results
+
+
+def bench_tracker(args):
+    from finger_tracker import FingerTracker
+
+    try:
+        FingerTracker().load()
+    except (ImportError, AttributeError) as exc:  # not installed, or a build without solutions.hands
+        print(f"  mediapipe unavailable ({exc}), skipping FingerTracker")
+        return {}
+
+    if not args.video:
+        # synthetic frames contain no hand, so every case would only time the no-detection path
+        print("  no --video given (frames must show a hand), skipping FingerTracker")
+        return {}
+
+    camera = CameraManager(source=args.video)
+    frames = []
+    while len(frames) < args.frames:
+        frame = camera.get_frame()
+        if frame is None:
+            break
+        frames.append(frame)
+    camera.release()
+    if not frames:
+        return {}
+
+    tracker = FingerTracker()
+    tracker.load()
+    frame_iter = iter(frames * 1000)
+    return {"update full": measure(lambda: tracker.update(next(frame_iter)), repeat=3)}
+
+
+BENCHMARKS = {
+    "spiral": bench_spiral,
+    "renderer": bench_renderer,
+    "trace": bench_trace,
+    "tracker": bench_tracker,
+}
+
+
+def compare(results, baseline, threshold):
+    """Cases slower than baseline * (1 + threshold), as (name, baseline, current)."""
+    return [(name, baseline[name], seconds) for name, seconds in results.items()
+            if name in baseline and seconds > baseline[name] * (1.0 + threshold)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark suite")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="benchmarks to run")
+    parser.add_argument("--video", help="recorded video showing a hand, for the FingerTracker benchmark")
+    parser.add_argument("--frames", type=int, default=60, help="frames used for the FingerTracker benchmark")
+    parser.add_argument("--baseline", help="JSON baseline to compare against")
+    parser.add_argument("--save-baseline", help="write the results as a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown as a fraction of the baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.only or BENCHMARKS:
+        print(f"{name}:")
+        for case, seconds in BENCHMARKS[name](args).items():
+            key = f"{name}/{case}"
+            results[key] = seconds
+            print(f"  {case:<40} {seconds * 1e6:12.1f} us")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for name, before, after in regressions:
+            print(f"❌ {name}: {before * 1e6:.1f} us -> {after * 1e6:.1f} us ({after / before - 1:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"✅ No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,264 @@
+import os
+import threading
+import time
+from collections import deque
+
 import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+class FramePacer:
+    def __init__(self, fps):
+        """Sleeps between reads so a source delivers at most fps frames per second."""
+        self.interval = 1.0 / fps
+        self._next_time = None
+
+    def wait(self):
+        now = time.monotonic()
+        if self._next_time is not None and self._next_time > now:
+            time.sleep(self._next_time - now)
+        self._next_time = max(now, self._next_time or now) + self.interval
 
-class CameraManager:
-    def __init__(self, camera_index=0):
-        self.cap = cv2.VideoCapture(camera_index)
 
-    def get_frame(self):
+class VideoFileSource:
+    def __init__(self, path, loop=False, realtime=False):
+        """
+        Frame source backed by cv2.VideoCapture (a video file or a camera index).
+
+        Args:
+            path: video file path or camera index
+            loop: restart from the first frame when the file ends
+            realtime: pace reads at the file's frame rate, like a live camera
+        """
+        self.path = path
+        self.loop = loop
+        self.cap = cv2.VideoCapture(path)
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.fps = fps if fps and fps > 0 else 30.0
+        self.realtime = realtime and not isinstance(path, int)
+        self._pacer = FramePacer(self.fps) if self.realtime else None
+
+    def read(self):
         ret, frame = self.cap.read()
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
         if not ret:
             return None
-        return cv2.flip(frame, 1)  # mirror view
+        if self._pacer is not None:
+            self._pacer.wait()
+        return frame
 
     def release(self):
         self.cap.release()
+
+
+class ImageDirectorySource:
+    def __init__(self, directory, loop=False, fps=None):
+        """
+        Frame source that reads the images of a directory in name order.
+
+        Args:
+            directory: folder of .png/.jpg/.jpeg/.bmp frames
+            loop: restart from the first image after the last one
+            fps: deliver at most this many frames per second (None = as fast as read)
+        """
+        self.files = sorted(
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        self.loop = loop
+        self.index = 0
+        self._pacer = FramePacer(fps) if fps else None
+
+    def read(self):
+        if self._pacer is not None:
+            self._pacer.wait()
+        if self.index >= len(self.files):
+            if not self.loop or not self.files:
+                return None
+            self.index = 0
+        frame = cv2.imread(self.files[self.index])
+        self.index += 1
+        return frame
+
+    def release(self):
+        pass
+
+
+class SyntheticSource:
+    def __init__(self, width=640, height=480, num_frames=None, generator=None, fps=None):
+        """
+        Frame source that needs no hardware.
+
+        Args:
+            width, height: frame size
+            num_frames: number of frames to produce (None = endless)
+            generator: optional callable(frame_index) -> BGR frame; the default
+                draws a dot circling the frame centre
+            fps: deliver at most this many frames per second like a camera
+                (None = as fast as frames can be drawn)
+        """
+        self.width = width
+        self.height = height
+        self.num_frames = num_frames
+        self.generator = generator
+        self.index = 0
+        self._pacer = FramePacer(fps) if fps else None
+
+    def read(self):
+        if self.num_frames is not None and self.index >= self.num_frames:
+            return None
+        if self._pacer is not None:
+            self._pacer.wait()
+        if self.generator is not None:
+            frame = self.generator(self.index)
+        else:
+            frame = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+            angle = self.index * 0.1
+            x = int(self.width / 2 + 100 * np.cos(angle))
+            y = int(self.height / 2 + 100 * np.sin(angle))
+            cv2.circle(frame, (x, y), 12, (200, 200, 200), -1)
+        self.index += 1
+        return frame
+
+    def release(self):
+        pass
+
+
+def open_source(spec, realtime=False, fps=30.0):
+    """
+    Build a frame source from a camera index, a path or "synthetic".
+
+    Args:
+        spec: camera index, video file, image directory or "synthetic"
+        realtime: pace files, image directories and synthetic frames like a
+            live camera (a threaded capture would otherwise race through them)
+        fps: pace of image directories and synthetic frames (video files use their own)
+    """
+    if isinstance(spec, int) or (isinstance(spec, str) and spec.isdigit()):
+        return VideoFileSource(int(spec))
+    paced_fps = fps if realtime else None
+    if spec == "synthetic":
+        return SyntheticSource(fps=paced_fps)
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec, fps=paced_fps)
+    if not os.path.exists(spec):
+        raise FileNotFoundError(f"Frame source not found: {spec}")
+    return VideoFileSource(spec, realtime=realtime)
+
+
+class CameraManager:
+    def __init__(self, camera_index=0, source=None, threaded=False, buffer_size=2, mirror=True, fps=30.0):
+        """
+        Frame provider for the game loop.
+
+        Args:
+            camera_index: webcam index, used when no source is given
+            source: frame source object (anything with read()/release()) or a
+                spec accepted by open_source
+            threaded: capture on a background thread and always hand out the
+                freshest frame, dropping stale ones; file, image-directory and
+                synthetic specs are then paced like a live camera
+            buffer_size: number of frames the capture ring keeps
+            mirror: flip frames horizontally (mirror view)
+            fps: pace of image-directory and synthetic specs when threaded
+        """
+        if source is None:
+            source = camera_index
+        if not hasattr(source, "read"):
+            source = open_source(source, realtime=threaded, fps=fps)
+        self.source = source
+        self.mirror = mirror
+        self.threaded = threaded
+
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.last_frame_time = None  # monotonic capture time of the last frame handed out
+
+        if threaded:
+            self._ring = deque(maxlen=max(buffer_size, 1))
+            self._cond = threading.Condition()
+            self._running = True
+            self._finished = False
+            self._thread = threading.Thread(target=self._capture_loop, daemon=True)
+            self._thread.start()
+
+    @classmethod
+    def from_config(cls, camera_cfg):
+        return cls(
+            camera_index=camera_cfg.get("index", 0),
+            source=camera_cfg.get("source"),
+            threaded=camera_cfg.get("threaded", False),
+            buffer_size=camera_cfg.get("buffer_size", 2),
+            mirror=camera_cfg.get("mirror", True),
+            fps=camera_cfg.get("fps", 30.0),
+        )
+
+    def _capture(self):
+        frame = self.source.read()
+        if frame is None:
+            return None
+        self.frames_captured += 1
+        if self.mirror:
+            frame = cv2.flip(frame, 1)
+        return frame
+
+    def _capture_loop(self):
+        try:
+            while self._running:
+                frame = self._capture()
+                captured_at = time.monotonic()
+                with self._cond:
+                    if frame is None:
+                        break
+                    if len(self._ring) == self._ring.maxlen:
+                        self.frames_dropped += 1  # oldest frame is evicted unseen
+                    self._ring.append((frame, captured_at))
+                    self._cond.notify_all()
+        finally:
+            # released here, never while a read() may still be blocked in the source
+            self.source.release()
+            with self._cond:
+                self._finished = True
+                self._cond.notify_all()
+
+    def get_frame(self, timeout=None):
+        """
+        Next frame (the freshest one when threaded).
+
+        Args:
+            timeout: seconds to wait for the capture thread; None waits as long
+                as a direct read would (a webcam's first frame can take seconds)
+
+        Returns:
+            BGR frame, or None at the end of the stream
+
+        Raises:
+            TimeoutError: no frame arrived within timeout (the stream is still open)
+        """
+        if not self.threaded:
+            frame = self._capture()
+            self.last_frame_time = time.monotonic()
+            return frame
+
+        with self._cond:
+            if not self._ring and not self._finished:
+                if not self._cond.wait_for(lambda: self._ring or self._finished, timeout):
+                    raise TimeoutError(f"No camera frame within {timeout}s")
+            if not self._ring:
+                return None
+            frame, self.last_frame_time = self._ring.pop()
+            self.frames_dropped += len(self._ring)
+            self._ring.clear()
+        return frame
+
+    def release(self):
+        if not self.threaded:
+            self.source.release()
+            return
+        self._running = False
+        # the capture thread releases the source once its current read() returns
+        self._thread.join(timeout=1.0)
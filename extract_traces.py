@@ -0,0 +1,218 @@
+"""
+Offline, parallel extraction of hand landmarks from recorded assessment videos.
+
+Every video is split into chunks of frames that are processed on a spawn
+process pool with one FingerTracker (one MediaPipe Hands graph) per worker.
+A worker seeks to its chunk, decodes and infers frame by frame into a
+preallocated record array, and saves it as a .npy file (written to a
+temporary name and renamed, so an interrupted run never leaves a partial
+chunk). Re-running skips finished chunks. When all chunks of a video exist
+they are merged into <output>/<video name>.npy.
+
+Chunks are planned from the frame count the container reports, which can
+be wrong: the last chunk of a video therefore reads until the end of the
+file, and a video reporting no frame count is read as a single chunk. The
+tracker is reset at the start of every chunk, so a chunk's landmarks do
+not depend on which chunk the worker processed before it.
+
+Each record holds the frame index, the video timestamp in seconds, the 21
+landmarks from FingerTracker.hand_landmarks (x, y in pixels; NaN when no
+hand) and the handedness score.
+
+Usage:
+    python extract_traces.py recordings/*.mp4 -o traces --workers 8
+"""
+import argparse
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import numpy as np
+
+RECORD_DTYPE = np.dtype([
+    ("frame", "<i4"),
+    ("t", "<f8"),                     # seconds from the start of the video
+    ("landmarks", "<f4", (21, 3)),    # FingerTracker.hand_landmarks; NaN when no hand was found
+    ("score", "<f4"),                 # handedness confidence, 0 when no hand
+])
+
+_tracker = None  # one per worker process, built by _init_worker
+
+
+def _default_tracker():
+    from finger_tracker import FingerTracker
+    return FingerTracker(landmarks=True)
+
+
+def _init_worker(tracker_factory):
+    global _tracker
+    _tracker = tracker_factory()
+    _tracker.load()
+
+
+def video_frame_count(path):
+    capture = cv2.VideoCapture(path)
+    count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    capture.release()
+    return count, fps
+
+
+def _open_at(path, start):
+    capture = cv2.VideoCapture(path)
+    if start:
+        capture.set(cv2.CAP_PROP_POS_FRAMES, start)
+        if int(capture.get(cv2.CAP_PROP_POS_FRAMES)) != start:
+            # container without reliable seeking: decode forward instead
+            capture.release()
+            capture = cv2.VideoCapture(path)
+            for _ in range(start):
+                if not capture.grab():
+                    break
+    return capture
+
+
+def chunk_path(output_dir, video, start):
+    name = os.path.splitext(os.path.basename(video))[0]
+    return os.path.join(output_dir, name + ".chunks", f"{start:09d}.npy")
+
+
+def _empty_records(count):
+    records = np.zeros(count, dtype=RECORD_DTYPE)
+    records["landmarks"] = np.nan
+    return records
+
+
+def extract_chunk(video, start, stop, fps, output_path):
+    """
+    Landmarks of frames [start, stop) of one video, saved to output_path. Runs in a worker.
+
+    stop=None reads until the end of the video.
+    """
+    records = _empty_records(stop - start if stop is not None else 1024)
+    tracker = _tracker
+    # a new chunk may come from another part or another video: start tracking afresh
+    tracker.reset()
+    capture = _open_at(video, start)
+    count = 0
+    try:
+        while stop is None or count < stop - start:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            if count == len(records):
+                records = np.concatenate((records, _empty_records(len(records))))
+            msec = capture.get(cv2.CAP_PROP_POS_MSEC)
+            frame_index = start + count
+            record = records[count]
+            record["frame"] = frame_index
+            record["t"] = msec / 1000.0 if msec > 0 or frame_index == 0 else frame_index / fps
+            tracker.update(frame)
+            record["landmarks"] = tracker.hand_landmarks
+            record["score"] = tracker.hand_score
+            count += 1
+    finally:
+        capture.release()
+
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, records[:count])
+    os.replace(tmp_path, output_path)
+    return video, start, count
+
+
+def merge_chunks(output_dir, video, starts, keep_chunks=False):
+    """Concatenate the chunk files of one video into <output_dir>/<name>.npy."""
+    paths = [chunk_path(output_dir, video, start) for start in starts]
+    chunks = [np.load(path, mmap_mode="r") for path in paths]
+    name = os.path.splitext(os.path.basename(video))[0]
+    final_path = os.path.join(output_dir, name + ".npy")
+    tmp_path = final_path + ".tmp"
+    merged = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=RECORD_DTYPE,
+                                       shape=(sum(len(c) for c in chunks),))
+    offset = 0
+    for chunk in chunks:
+        merged[offset:offset + len(chunk)] = chunk
+        offset += len(chunk)
+    merged.flush()
+    del merged, chunks
+    os.replace(tmp_path, final_path)
+    if not keep_chunks:
+        for path in paths:
+            os.remove(path)
+        os.rmdir(os.path.dirname(paths[0]))
+    return final_path
+
+
+def extract(videos, output_dir, workers=None, chunk_frames=600, keep_chunks=False,
+            tracker_factory=_default_tracker):
+    """
+    Extract landmarks of every video, resuming from chunks left by an earlier run.
+
+    Args:
+        videos: video files
+        output_dir: destination of the merged .npy files (chunks go in <name>.chunks/)
+        workers: pool size (defaults to the CPU count)
+        chunk_frames: frames per pool task
+        keep_chunks: leave the chunk files after merging
+        tracker_factory: picklable callable building the per-worker FingerTracker
+            (with landmarks=True)
+
+    Returns:
+        (paths of the per-video .npy files, frames processed in this run)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    plan = {}
+    todo = []
+    finished = []
+    for video in videos:
+        name = os.path.splitext(os.path.basename(video))[0]
+        if os.path.exists(os.path.join(output_dir, name + ".npy")):
+            finished.append(os.path.join(output_dir, name + ".npy"))  # done in an earlier run
+            continue
+        count, fps = video_frame_count(video)
+        if count <= 0:
+            print(f"⚠️ {video} reports no frame count; extracting it as a single chunk")
+        starts = list(range(0, max(count, 1), chunk_frames))
+        plan[video] = starts
+        os.makedirs(os.path.dirname(chunk_path(output_dir, video, 0)), exist_ok=True)
+        for start, stop in zip(starts, starts[1:] + [None]):
+            path = chunk_path(output_dir, video, start)
+            if not os.path.exists(path):
+                # the last chunk reads to the end of the file in case the count is low
+                todo.append((video, start, stop, fps, path))
+
+    processed = 0
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(tracker_factory,)) as pool:
+            futures = [pool.submit(extract_chunk, *task) for task in todo]
+            for future in as_completed(futures):
+                video, start, count = future.result()
+                processed += count
+
+    merged = [merge_chunks(output_dir, video, starts, keep_chunks) for video, starts in plan.items()]
+    return finished + merged, processed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel video-to-landmark extraction")
+    parser.add_argument("videos", nargs="+")
+    parser.add_argument("-o", "--output", default="traces")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-frames", type=int, default=600)
+    parser.add_argument("--keep-chunks", action="store_true")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    merged, processed = extract(args.videos, args.output, args.workers, args.chunk_frames, args.keep_chunks)
+    elapsed = time.perf_counter() - start
+    print(f"Processed {processed} frames in {elapsed:.1f}s ({processed / max(elapsed, 1e-9):.1f} fps)")
+    for path in merged:
+        print(f"  {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import math
+
+import numpy as np
+
+
+class OneEuroFilter:
+    def __init__(self, min_cutoff=1.0, beta=0.05, d_cutoff=1.0):
+        """
+        One Euro filter (Casiez et al.) applied element-wise to an array.
+
+        Smooths heavily when the signal moves slowly (jitter) and follows fast
+        motion with little lag. Works on any array shape, e.g. (3,) for one
+        fingertip or (21, 3) for a whole hand.
+
+        Args:
+            min_cutoff: cutoff frequency in Hz at rest
+            beta: how quickly the cutoff rises with speed (scalar or per-column array)
+            d_cutoff: cutoff frequency in Hz for the speed estimate
+        """
+        self.min_cutoff = min_cutoff
+        self.beta = np.asarray(beta, dtype=np.float64)
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self._x = None
+        self._dx = None
+        self._t = None
+
+    @staticmethod
+    def _alpha(dt, cutoff):
+        tau = 1.0 / (2.0 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def __call__(self, x, t):
+        x = np.asarray(x, dtype=np.float64)
+        if self._x is None:
+            self._x = x.copy()
+            self._dx = np.zeros_like(x)
+            self._t = t
+            return self._x.copy()
+        dt = max(t - self._t, 1e-3)
+        self._t = t
+
+        a_d = self._alpha(dt, self.d_cutoff)
+        self._dx = a_d * (x - self._x) / dt + (1.0 - a_d) * self._dx
+        cutoff = self.min_cutoff + self.beta * np.abs(self._dx)
+        a = self._alpha(dt, cutoff)
+        self._x = a * x + (1.0 - a) * self._x
+        return self._x.copy()
+
+    def predict(self, horizon):
+        """Extrapolate the filtered position horizon seconds ahead."""
+        if self._x is None:
+            return None
+        return self._x + self._dx * horizon
+
+
+class ConstantVelocityKalman:
+    def __init__(self, process_noise=2000.0, measurement_noise=4.0):
+        """
+        Constant-velocity Kalman filter, one independent 2-state filter per element.
+
+        The covariance is kept as three arrays (P00, P01, P11) so the update is
+        a handful of vectorized operations for any number of landmarks.
+
+        Args:
+            process_noise: acceleration noise spectral density (units^2 / s^3)
+            measurement_noise: measurement variance (units^2), scalar or per-column
+        """
+        self.q = np.asarray(process_noise, dtype=np.float64)
+        self.r = np.asarray(measurement_noise, dtype=np.float64)
+        self.reset()
+
+    def reset(self):
+        self._x = None
+        self._v = None
+        self._t = None
+
+    def __call__(self, z, t):
+        z = np.asarray(z, dtype=np.float64)
+        if self._x is None:
+            self._x = z.copy()
+            self._v = np.zeros_like(z)
+            self._p00 = np.broadcast_to(self.r, z.shape).astype(np.float64)
+            self._p01 = np.zeros_like(z)
+            self._p11 = np.full_like(z, 1e4)
+            self._t = t
+            return self._x.copy()
+        dt = max(t - self._t, 1e-3)
+        self._t = t
+        q = self.q
+
+        # predict
+        self._x = self._x + self._v * dt
+        self._p00 = self._p00 + dt * (2.0 * self._p01 + dt * self._p11) + q * dt ** 3 / 3.0
+        self._p01 = self._p01 + dt * self._p11 + q * dt ** 2 / 2.0
+        self._p11 = self._p11 + q * dt
+
+        # update
+        s = self._p00 + self.r
+        k0 = self._p00 / s
+        k1 = self._p01 / s
+        y = z - self._x
+        self._x = self._x + k0 * y
+        self._v = self._v + k1 * y
+        self._p11 = self._p11 - k1 * self._p01
+        self._p01 = (1.0 - k0) * self._p01
+        self._p00 = (1.0 - k0) * self._p00
+        return self._x.copy()
+
+    def predict(self, horizon):
+        """Extrapolate the filtered position horizon seconds ahead."""
+        if self._x is None:
+            return None
+        return self._x + self._v * horizon
+
+
+FILTERS = {
+    "one_euro": OneEuroFilter,
+    "kalman": ConstantVelocityKalman,
+}
+
+
+def make_filter(name, **params):
+    """Build a filter by config name ("one_euro", "kalman"); None/"none" disables filtering."""
+    if name in (None, "none"):
+        return None
+    if name not in FILTERS:
+        raise ValueError(f"Unknown filter '{name}', expected one of {sorted(FILTERS)}")
+    return FILTERS[name](**params)
@@ -1,30 +1,346 @@
-import mediapipe as mp
+import threading
+import time
+from itertools import chain
+from operator import attrgetter
+
 import cv2
+import numpy as np
+
+from filters import make_filter
+from landmark_ring import LandmarkRing
+
+_XYZ = attrgetter("x", "y", "z")
+_NO_LANDMARKS = np.full((21, 3), np.nan, dtype=np.float32)
 
 class FingerTracker:
-    def __init__(self):
-        self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(max_num_hands=1)
-        self.mp_draw = mp.solutions.drawing_utils
+    def __init__(self, position_filter=None, predict=False, keyframe=False, frame_budget_ms=15.0, max_keyframe_interval=8, landmarks=False,
+                 landmark_history=0):
+        """
+        Index fingertip tracker built on MediaPipe Hands.
+
+        MediaPipe is imported and the model built lazily: call start_warm_up()
+        to do it on a background thread (update() returns None until ready), or
+        load() to do it synchronously. The first update() loads it if neither ran.
+
+        Args:
+            position_filter: smoothing filter from filters.make_filter (None = raw output)
+            predict: extrapolate the filtered fingertip by the measured pipeline
+                latency for display; raw_position always keeps the measurement
+            keyframe: run MediaPipe only on keyframes and follow the fingertip with
+                pyramidal Lucas-Kanade optical flow in between
+            frame_budget_ms: average per-frame tracking cost the keyframe interval adapts to
+            max_keyframe_interval: upper bound on frames between detections; when optical
+                flow loses the fingertip the bound is halved and only relaxes again after
+                max_keyframe_interval consecutive successfully tracked frames
+            landmarks: also extract all 21 hand landmarks into hand_landmarks every frame
+            landmark_history: frames of landmarks kept in landmark_ring (0 = none); only
+                MediaPipe measurements are kept, optical-flow frames are stored as NaN
+                with score 0
+        """
+        self.mp_hands = None
+        self.hands = None
+        self.mp_draw = None
         # approximate scale factor: 1 unit z = 1 meter (adjust experimentally)
         self.z_scale = 0.5  # adjust based on your camera distance
 
-    def update(self, frame):
+        self.filter = position_filter
+        self.predict = predict and position_filter is not None
+        # unfiltered (x, y, z) MediaPipe measurement of the last frame, for tremor scoring;
+        # None when there is none (no hand, or an optical-flow frame in keyframe mode)
+        self.raw_position = None
+        self.measured = False  # the last update() returned a MediaPipe measurement
+        self.latency = 0.0  # capture-to-output seconds of the last frame
+
+        self.keyframe = keyframe
+        self.frame_budget = frame_budget_ms / 1000.0
+        self.max_keyframe_interval = max_keyframe_interval
+        self.keyframe_interval = 1
+        self.keyframe_interval_cap = max_keyframe_interval  # lowered while tracking is unreliable
+        self._flow_streak = 0  # consecutive successful flow frames since the last failure
+        self.keyframes = 0
+        self.tracked_frames = 0
+        self._detect_cost = None  # EMA seconds of a MediaPipe keyframe
+        self._flow_cost = None    # EMA seconds of an optical-flow frame
+        self._since_keyframe = 0
+        self._prev_gray = None
+        self._flow_points = None  # (N, 1, 2) float32 features around the fingertip
+        self._flow_tip = None     # (x, y, z) float fingertip carried between keyframes
+
+        self.landmarks = landmarks or landmark_history > 0
+        # (21, 3) float32, updated in place: x, y in full-frame pixels, z like MediaPipe
+        # but normalized to the full frame width; NaN when no hand was found. On
+        # keyframe-mode optical-flow frames they are the keyframe's landmarks
+        # shifted with the fingertip, an estimate rather than a measurement
+        self.hand_landmarks = np.full((21, 3), np.nan, dtype=np.float32)
+        self.handedness = None  # "Left" / "Right" as reported by MediaPipe
+        self.hand_score = 0.0
+        self.landmark_ring = LandmarkRing(landmark_history) if landmark_history > 0 else None
+
+        self.timings = {}  # seconds spent in mediapipe_import / model_init / first_inference
+        self._ready = threading.Event()
+        self._warm_up_thread = None
+        self._warm_up_error = None
+        self._load_lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def load(self):
+        """Import MediaPipe, build the model and run one warm-up inference (blocking)."""
+        with self._load_lock:
+            if self.ready:
+                return
+            start = time.perf_counter()
+            import mediapipe as mp
+            self.timings["mediapipe_import"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            self.mp_hands = mp.solutions.hands
+            self.hands = self._build_hands()
+            self.mp_draw = mp.solutions.drawing_utils
+            self.timings["model_init"] = time.perf_counter() - start
+
+            # the first process() call pays for graph initialization; do it here
+            start = time.perf_counter()
+            self.hands.process(np.zeros((240, 320, 3), dtype=np.uint8))
+            self.timings["first_inference"] = time.perf_counter() - start
+            self._ready.set()
+
+    def _build_hands(self):
+        # tracking mode: MediaPipe follows the hand from frame to frame and only
+        # runs palm detection when it loses it
+        return self.mp_hands.Hands(max_num_hands=1)
+
+    def reset(self):
+        """
+        Forget everything carried between frames, as for a new, unrelated stream.
+
+        MediaPipe's hand tracking, the position filter, the keyframe
+        and optical-flow state and the landmark history start over, so the next
+        frame is processed exactly like the first frame of a fresh tracker.
+        The keyframe cost estimates are kept (they describe the machine).
+        """
+        if self.hands is not None:
+            self.hands.close()
+            self.hands = self._build_hands()
+        if self.filter is not None:
+            self.filter.reset()
+        self.raw_position = None
+        self.measured = False
+        self.keyframe_interval = 1
+        self.keyframe_interval_cap = self.max_keyframe_interval
+        self._flow_streak = 0
+        self._since_keyframe = 0
+        self._prev_gray = None
+        self._flow_points = None
+        self._flow_tip = None
+        self.hand_landmarks[:] = np.nan
+        self.handedness = None
+        self.hand_score = 0.0
+        if self.landmark_ring is not None:
+            self.landmark_ring.clear()
+
+    def start_warm_up(self):
+        """Load the model on a background thread while the UI is already running."""
+        if self._warm_up_thread is None and not self.ready:
+            self._warm_up_thread = threading.Thread(target=self._warm_up, daemon=True)
+            self._warm_up_thread.start()
+        return self._warm_up_thread
+
+    def _warm_up(self):
+        try:
+            self.load()
+        except Exception as exc:  # re-raised on the frame loop thread by update()
+            self._warm_up_error = exc
+
+    @classmethod
+    def from_config(cls, tracker_cfg):
+        # filter_params holds one entry per filter name; only the selected one is used
+        filter_name = tracker_cfg.get("filter")
+        return cls(
+            position_filter=make_filter(filter_name, **tracker_cfg.get("filter_params", {}).get(filter_name) or {}),
+            predict=tracker_cfg.get("predict", False),
+            keyframe=tracker_cfg.get("keyframe", False),
+            frame_budget_ms=tracker_cfg.get("frame_budget_ms", 15.0),
+            max_keyframe_interval=tracker_cfg.get("max_keyframe_interval", 8),
+            landmarks=tracker_cfg.get("landmarks", False),
+            landmark_history=tracker_cfg.get("landmark_history", 0),
+        )
+
+    def _detect(self, frame):
         frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         results = self.hands.process(frame_rgb)
+        if not results.multi_hand_landmarks:
+            return None
+        if self.landmarks and results.multi_handedness:
+            classification = results.multi_handedness[0].classification[0]
+            self.handedness, self.hand_score = classification.label, classification.score
+        return results.multi_hand_landmarks[0]
+
+    def update(self, frame, captured_at=None):
+        """
+        Fingertip (x, y, z) for this frame, or None when no hand is found.
+
+        Args:
+            frame: BGR frame
+            captured_at: time.monotonic() when the frame was captured; used as the
+                sample time for filtering and to measure the latency to predict over
+        """
+        if not self.ready:
+            if self._warm_up_error is not None:
+                raise RuntimeError("Hand tracker failed to load") from self._warm_up_error
+            if self._warm_up_thread is not None:
+                return None  # still warming up in the background
+            self.load()
+
+        if captured_at is None:
+            captured_at = time.monotonic()
+        if self.keyframe:
+            raw, self.measured = self._measure_adaptive(frame)
+        else:
+            raw = self._measure(frame)
+            self.measured = raw is not None
+        # interpolated flow positions drive the display but are not measurements
+        self.raw_position = raw if self.measured else None
+        self.latency = time.monotonic() - captured_at
+        if self.landmark_ring is not None:
+            # flow frames move every landmark rigidly with the fingertip, which would
+            # bias wrist-vs-finger analysis: the history keeps measurements only
+            if self.measured:
+                self.landmark_ring.push(captured_at, self.hand_landmarks, self.hand_score)
+            else:
+                self.landmark_ring.push(captured_at, _NO_LANDMARKS, 0.0)
+        if raw is None:
+            if self.filter is not None:
+                self.filter.reset()
+            return None
+        if self.filter is None:
+            return raw
+
+        smoothed = self.filter(raw, captured_at)
+        if self.predict:
+            smoothed = self.filter.predict(self.latency)
+        return (int(round(smoothed[0])), int(round(smoothed[1])), float(smoothed[2]))
+
+    @staticmethod
+    def _ema(previous, value, weight=0.2):
+        return value if previous is None else previous + weight * (value - previous)
+
+    def _measure_adaptive(self, frame):
+        """
+        Keyframe mode: MediaPipe on keyframes, optical flow in between.
+
+        Returns:
+            (fingertip or None, True when it is a MediaPipe measurement)
+        """
+        start = time.perf_counter()
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self._flow_tip is not None and self._since_keyframe < self.keyframe_interval:
+            tip = self._track_flow(gray)
+            if tip is not None:
+                self._since_keyframe += 1
+                self.tracked_frames += 1
+                self._flow_cost = self._ema(self._flow_cost, time.perf_counter() - start)
+                self._flow_streak += 1
+                if (self._flow_streak >= self.max_keyframe_interval
+                        and self.keyframe_interval_cap < self.max_keyframe_interval):
+                    # tracking has been reliable for a while: allow longer intervals again
+                    self.keyframe_interval_cap = min(self.keyframe_interval_cap * 2, self.max_keyframe_interval)
+                    self._flow_streak = 0
+                return (int(tip[0]), int(tip[1]), tip[2]), False
+            # tracking confidence too low: cap the interval and detect now
+            self.keyframe_interval_cap = max(1, self.keyframe_interval // 2)
+            self._flow_streak = 0
+
+        raw = self._measure(frame)
+        self.keyframes += 1
+        self._since_keyframe = 1
+        self._prev_gray = gray
+        self._flow_tip = None
+        if raw is not None:
+            self._seed_flow(gray, raw)
+        self._detect_cost = self._ema(self._detect_cost, time.perf_counter() - start)
+        self._adapt_interval()
+        return raw, raw is not None
+
+    def _seed_flow(self, gray, tip):
+        x, y = tip[0], tip[1]
+        mask = np.zeros_like(gray)
+        cv2.circle(mask, (int(x), int(y)), 30, 255, -1)
+        points = cv2.goodFeaturesToTrack(gray, maxCorners=20, qualityLevel=0.01, minDistance=4, mask=mask)
+        if points is None or len(points) < 4:
+            # textureless patch: fall back to a small grid around the fingertip
+            offsets = np.array([(dx, dy) for dx in (-8, 0, 8) for dy in (-8, 0, 8)], dtype=np.float32)
+            points = (offsets + np.float32((x, y))).reshape(-1, 1, 2)
+        self._flow_points = points.astype(np.float32)
+        self._flow_tip = (float(x), float(y), tip[2])
+
+    def _track_flow(self, gray, fb_threshold=1.5):
+        """Move the fingertip by the median flow of its features; None when unreliable."""
+        lk = dict(winSize=(21, 21), maxLevel=2,
+                  criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+        p0 = self._flow_points
+        p1, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, p0, None, **lk)
+        if p1 is None:
+            return None
+        back, status_back, _ = cv2.calcOpticalFlowPyrLK(gray, self._prev_gray, p1, None, **lk)
+        fb_error = np.linalg.norm((p0 - back).reshape(-1, 2), axis=1)
+        good = (status.ravel() == 1) & (status_back.ravel() == 1) & (fb_error < fb_threshold)
+        if good.sum() < max(3, len(p0) // 2):
+            return None
+        shift = np.median((p1 - p0).reshape(-1, 2)[good], axis=0)
+        x, y, z = self._flow_tip
+        self._flow_tip = (x + float(shift[0]), y + float(shift[1]), z)
+        self._flow_points = p1[good].reshape(-1, 1, 2)
+        self._prev_gray = gray
+        if self.landmarks:
+            # no detection between keyframes: the hand moves rigidly with the fingertip
+            self.hand_landmarks[:, :2] += shift
+        return self._flow_tip
+
+    def _adapt_interval(self):
+        """Pick the keyframe interval whose average cost fits the frame budget, within the confidence cap."""
+        if self._detect_cost is None or self._flow_cost is None:
+            self.keyframe_interval = min(2, self.keyframe_interval_cap)
+            return
+        detect, flow = self._detect_cost, self._flow_cost
+        if detect <= self.frame_budget:
+            interval = 1
+        elif flow >= self.frame_budget:
+            interval = self.max_keyframe_interval
+        else:
+            # (detect + (n - 1) * flow) / n <= budget
+            interval = int(np.ceil((detect - flow) / (self.frame_budget - flow)))
+        self.keyframe_interval = int(np.clip(interval, 1, self.keyframe_interval_cap))
+
+    def _extract_landmarks(self, hand, w, h):
+        """Fill hand_landmarks in place; the landmark iteration runs in C (map/attrgetter/chain)."""
+        out = self.hand_landmarks
+        out.reshape(-1)[:] = np.fromiter(chain.from_iterable(map(_XYZ, hand.landmark)),
+                                         dtype=np.float32, count=out.size)
+        # normalized -> pixels (x, y); z stays width-normalized like MediaPipe's
+        out *= np.array((w, h, 1.0), dtype=np.float32)
 
-        if results.multi_hand_landmarks:
-            hand = results.multi_hand_landmarks[0]
-            # use index fingertip
-            fingertip = hand.landmark[self.mp_hands.HandLandmark.INDEX_FINGER_TIP]
+    def _measure(self, frame):
+        """Raw fingertip from MediaPipe."""
+        h, w, _ = frame.shape
+        hand = self._detect(frame)
+        if hand is None:
+            if self.landmarks:
+                self.hand_landmarks.fill(np.nan)
+                self.handedness, self.hand_score = None, 0.0
+            return None
 
-            h, w, _ = frame.shape
-            x = int(fingertip.x * w)
-            y = int(fingertip.y * h)
-            # z normalized, multiply by scale to get meters
-            z = fingertip.z * self.z_scale + 0.5  # offset so target_z = 0.5m at screen plane
+        if self.landmarks:
+            self._extract_landmarks(hand, w, h)
 
-            return (x, y, z)
+        # use index fingertip
+        fingertip = hand.landmark[self.mp_hands.HandLandmark.INDEX_FINGER_TIP]
 
-        return None
+        x = int(fingertip.x * w)
+        y = int(fingertip.y * h)
+        # z normalized, multiply by scale to get meters
+        z = fingertip.z * self.z_scale + 0.5  # offset so target_z = 0.5m at screen plane
 
+        return (x, y, z)
@@ -0,0 +1,151 @@
+import time
+
+from profiler import Profiler
+from scheduler import FixedTimestepScheduler
+from spiral import Spiral
+from stages import TraceStage, build_stages
+
+SPIRAL_KEYS = ("center", "inner_radius", "outer_radius", "turns", "num_points")
+
+
+def _spiral(spiral_cfg, scale=1.0):
+    return Spiral(
+        center=tuple(spiral_cfg.get("center", (320, 240))),
+        inner_radius=int(spiral_cfg.get("inner_radius", 50) * scale),
+        outer_radius=int(spiral_cfg.get("outer_radius", 200) * scale),
+        turns=spiral_cfg.get("turns", 2),
+        num_points=spiral_cfg.get("num_points", 500)
+    )
+
+
+def build_spirals(spiral_cfg):
+    """
+    Named spirals a protocol can refer to.
+
+    "main" is the configured spiral and "small" the same spiral at 60% of its
+    radii. Extra spirals come from `spiral.variants`, each a dict overriding
+    any of SPIRAL_KEYS, optionally with a `scale` applied to the radii.
+
+    Returns:
+        dict name -> Spiral
+    """
+    spirals = {
+        "main": _spiral(spiral_cfg),
+        # Second (smaller) spiral — same centre, 60% radius
+        "small": _spiral(spiral_cfg, scale=0.6),
+    }
+    for name, variant in (spiral_cfg.get("variants") or {}).items():
+        variant = variant or {}
+        merged = {key: variant.get(key, spiral_cfg.get(key)) for key in SPIRAL_KEYS
+                  if key in variant or key in spiral_cfg}
+        spirals[name] = _spiral(merged, scale=variant.get("scale", 1.0))
+    return spirals
+
+
+class GameLoop:
+    def __init__(self, config, spirals, trace_manager, renderer, game_state,
+                 tremor, session_log=None, clock=time.monotonic, verbose=True, profiler=None):
+        """
+        Per-frame game logic and rendering, independent of camera and window.
+
+        The protocol is the list of stages built from config.yaml `instructions`
+        (see stages.py); every tick, sample and render is dispatched to the
+        active stage. Game progression runs on a FixedTimestepScheduler, so dot
+        speed, countdowns and step timers do not depend on the frame rate.
+
+        Args:
+            config: loaded config.yaml dict
+            spirals: dict name -> Spiral from build_spirals()
+            trace_manager, renderer, game_state, tremor: game components
+            session_log: optional SessionLogWriter
+            clock: callable returning seconds; a ManualClock makes runs deterministic
+            verbose: print scores when a spiral is completed
+            profiler: optional Profiler timing the tick/sample/render stages
+        """
+        self.spirals = spirals
+        self.trace_manager = trace_manager
+        self.renderer = renderer
+        self.game_state = game_state
+        self.tremor = tremor
+        self.session_log = session_log
+        self.clock = clock
+        self.verbose = verbose
+        self.profiler = profiler or Profiler()
+
+        game_cfg = config.get("game", {})
+        self.scheduler = FixedTimestepScheduler(tick_rate=game_cfg.get("tick_rate", 60),
+                                                clock=clock)
+        self.speed_multiplier = game_cfg.get("speed_multiplier", 16.0)
+        self.end_circle_radius = game_cfg.get("end_circle_radius", 30)
+        self.depth_tolerance = game_cfg.get("depth_tolerance", 0.05)
+
+        self.stages = build_stages(config.get("instructions"), spirals, self.end_circle_radius)
+        self.steps = [(stage.title, stage.duration) for stage in self.stages]
+        self.current_step = 0
+
+        self.reference_dot_pos = None
+        self.spiral_color = None
+        self.depth_status = None
+        self.completed = False  # every stage done
+        self.frame_time = None  # clock() of the last processed frame, as written to the session log
+
+        self.stage = self.stages[0]
+        self.stage.enter(self, self.scheduler.time)
+
+    def protocol_metadata(self):
+        """
+        Session log metadata describing the scored tracings of this protocol.
+
+        Returns:
+            {"spirals": label -> spiral spec, "tracing_steps": step index -> label,
+             "directions": label -> "forward" | "reverse"}
+        """
+        traces = [(i, stage) for i, stage in enumerate(self.stages) if isinstance(stage, TraceStage)]
+        return {
+            "spirals": {stage.label: stage.spiral.spec() for _, stage in traces},
+            "tracing_steps": {str(i): stage.label for i, stage in traces},
+            "directions": {stage.label: "reverse" if stage.reverse else "forward" for _, stage in traces},
+        }
+
+    def process_frame(self, frame, finger_pos, raw_pos=None, measured=True):
+        """
+        Run the simulation ticks that are due, record the sample and draw the frame.
+
+        Args:
+            frame: frame to draw onto
+            finger_pos: fingertip used for interaction and display (may be filtered)
+            raw_pos: unfiltered measurement for scoring; defaults to finger_pos
+            measured: False when finger_pos is not a measurement (optical flow between
+                keyframes); the frame is then drawn but not scored or logged as a sample
+        """
+        if raw_pos is None and measured:
+            raw_pos = finger_pos
+        now = self.clock()
+        self.frame_time = now
+        with self.profiler.span("tick"):
+            for sim_time in self.scheduler.advance():
+                self._tick(finger_pos, sim_time)
+        with self.profiler.span("sample"):
+            self.stage.sample(self, finger_pos, raw_pos, now)
+        with self.profiler.span("render"):
+            self.stage.render(self, frame)
+
+        if self.session_log is not None:
+            self.session_log.log(now, self.current_step, self.game_state.state, raw_pos,
+                                 self.reference_dot_pos, self.spiral_color)
+
+    def _tick(self, finger_pos, now):
+        """One fixed simulation step of the active stage; moves on when it is done."""
+        if self.completed:
+            return
+        # a new stage gets the same tick, so zero-length stages pass straight through
+        while self.stage.tick(self, finger_pos, now):
+            if self.current_step == len(self.stages) - 1:
+                self.completed = True
+                if self.verbose:
+                    print("✅ All stages completed!")
+                return
+            self.stage.exit(self, now)
+            self.current_step += 1
+            self.stage = self.stages[self.current_step]
+            self.stage.enter(self, now)
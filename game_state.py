@@ -8,6 +8,36 @@ class GameState:
 
     def __init__(self):
         self.state = self.WAITING
+        self.reset_deviation()
+
+    def reset_deviation(self):
+        """Clear the running deviation-from-spiral statistics (call when a trace starts)."""
+        self.deviation_samples = 0
+        self.deviation_sum = 0.0
+        self.deviation_sq_sum = 0.0
+        self.deviation_max = 0.0
+
+    def update_deviation(self, finger_pos, spiral):
+        """Add one fingertip sample to the running deviation stats while TRACING."""
+        if self.state != self.TRACING or finger_pos is None:
+            return None
+        distance, _ = spiral.distance_to_path(finger_pos)
+        self.deviation_samples += 1
+        self.deviation_sum += distance
+        self.deviation_sq_sum += distance * distance
+        self.deviation_max = max(self.deviation_max, distance)
+        return distance
+
+    def deviation_summary(self):
+        n = self.deviation_samples
+        if n == 0:
+            return {"samples": 0, "mean": 0.0, "rms": 0.0, "max": 0.0}
+        return {
+            "samples": n,
+            "mean": self.deviation_sum / n,
+            "rms": math.sqrt(self.deviation_sq_sum / n),
+            "max": self.deviation_max,
+        }
 
     def update(self, finger_pos, spiral, reference_dot_pos, end_circle_pos):
         if self.state == self.WAITING:
@@ -0,0 +1,174 @@
+"""
+Headless end-to-end run of the game loop for benchmarking.
+
+Runs the full step sequence without a window or waitKey sleep, on a manual
+clock that advances one frame period per frame. Input is either a recorded
+video (real FingerTracker) or a scripted fingertip that follows the game.
+Reports throughput and p50/p95/p99 per-frame latency for every step.
+
+Usage:
+    python headless.py                      # scripted fingertip
+    python headless.py --video clip.mp4     # recorded footage through MediaPipe
+    python headless.py --json results.json  # also save the report
+"""
+import argparse
+import json
+import math
+import time
+
+import numpy as np
+
+from camera_manager import CameraManager, SyntheticSource
+from config_loader import load_config
+from game_loop import GameLoop, build_spirals
+from game_state import GameState
+from renderer import Renderer
+from scheduler import ManualClock
+from stages import CountdownStage, FreeTraceStage, TraceStage
+from trace_manager import TraceManager
+from tremor_analysis import TremorAnalyzer
+
+
+class ScriptedFingerTracker:
+    def __init__(self, game, clock, tremor_hz=0.0, tremor_px=0.0):
+        """
+        Stand-in for FingerTracker that plays a patient who follows the game.
+
+        Args:
+            game: GameLoop whose state drives the trajectory
+            clock: clock used for the free-draw motion and tremor
+            tremor_hz, tremor_px: optional sinusoidal tremor added to x
+        """
+        self.game = game
+        self.clock = clock
+        self.tremor_hz = tremor_hz
+        self.tremor_px = tremor_px
+
+    def _target(self):
+        game = self.game
+        stage = game.stage
+        t = self.clock()
+        if isinstance(stage, FreeTraceStage):
+            cx, cy = stage.spiral.center
+            return cx + 80 * math.cos(t), cy + 80 * math.sin(t), 0.5
+        if isinstance(stage, CountdownStage):
+            return tuple(stage.target.start_point) + (0.5,)
+        if isinstance(stage, TraceStage):
+            if not stage.started:
+                return tuple(stage.start_point) + (0.5,)
+            return tuple(game.reference_dot_pos) + (0.5,)
+        cx, cy = stage.spiral.center
+        return cx, cy, 0.5 + 0.1 * math.sin(t)  # wander through the depth bands
+
+    def update(self, frame):
+        x, y, z = self._target()
+        if self.tremor_px:
+            x += self.tremor_px * math.sin(2 * math.pi * self.tremor_hz * self.clock())
+        return (int(x), int(y), z)
+
+
+def latency_stats(latencies_ms):
+    values = np.asarray(latencies_ms)
+    return {
+        "frames": int(len(values)),
+        "fps": float(1000.0 * len(values) / values.sum()) if len(values) else 0.0,
+        "p50_ms": float(np.percentile(values, 50)) if len(values) else 0.0,
+        "p95_ms": float(np.percentile(values, 95)) if len(values) else 0.0,
+        "p99_ms": float(np.percentile(values, 99)) if len(values) else 0.0,
+    }
+
+
+def run_headless(config, video=None, max_frames=20000, tremor_hz=0.0, tremor_px=0.0):
+    """
+    Drive the game loop headlessly until every stage is done, the input ends
+    or max_frames is reached.
+
+    Returns:
+        report dict with overall and per-step throughput/latency
+    """
+    fps = config.get("display", {}).get("fps", 30)
+    clock = ManualClock()
+    game = GameLoop(config, build_spirals(config.get("spiral", {})),
+                    TraceManager.from_config(config.get("trace", {})), Renderer(), GameState(),
+                    TremorAnalyzer.from_config(config.get("tremor", {})),
+                    clock=clock, verbose=False)
+
+    if video is not None:
+        from finger_tracker import FingerTracker
+        camera = CameraManager(source=video)
+        tracker = FingerTracker.from_config(config.get("tracker", {}))
+        tracker.load()  # model start-up is not part of the per-frame latency
+    else:
+        camera = CameraManager(source=SyntheticSource(), mirror=False)
+        tracker = ScriptedFingerTracker(game, clock, tremor_hz, tremor_px)
+
+    per_step = {}
+    all_latencies = []
+    wall_start = time.perf_counter()
+    try:
+        for _ in range(max_frames):
+            start = time.perf_counter()
+            frame = camera.get_frame()
+            if frame is None:
+                break
+            step = game.current_step
+            finger_pos = tracker.update(frame)
+            game.process_frame(frame, finger_pos, raw_pos=getattr(tracker, "raw_position", None),
+                               measured=getattr(tracker, "measured", True))
+            elapsed_ms = (time.perf_counter() - start) * 1000.0
+            per_step.setdefault(step, []).append(elapsed_ms)
+            all_latencies.append(elapsed_ms)
+            clock.advance(1.0 / fps)
+            if game.completed:
+                break
+    finally:
+        camera.release()
+    wall = time.perf_counter() - wall_start
+
+    report = {
+        "input": video or "scripted",
+        "completed": game.completed,
+        "simulated_seconds": clock(),
+        "wall_seconds": wall,
+        "throughput_fps": len(all_latencies) / wall if wall > 0 else 0.0,
+        "overall": latency_stats(all_latencies),
+        "steps": {},
+    }
+    for step, latencies in sorted(per_step.items()):
+        stats = latency_stats(latencies)
+        stats["name"] = game.steps[step][0]
+        report["steps"][step] = stats
+    return report
+
+
+def print_report(report):
+    print(f"input: {report['input']}  completed: {report['completed']}  "
+          f"simulated {report['simulated_seconds']:.1f}s in {report['wall_seconds']:.2f}s wall")
+    print(f"throughput: {report['throughput_fps']:.1f} fps")
+    print(f"{'step':>4}  {'frames':>6}  {'fps':>8}  {'p50 ms':>7}  {'p95 ms':>7}  {'p99 ms':>7}  name")
+    rows = list(report["steps"].items()) + [("all", report["overall"])]
+    for step, s in rows:
+        print(f"{step:>4}  {s['frames']:>6}  {s['fps']:>8.1f}  {s['p50_ms']:>7.3f}  "
+              f"{s['p95_ms']:>7.3f}  {s['p99_ms']:>7.3f}  {s.get('name', '')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless game-loop benchmark")
+    parser.add_argument("--config", default="config.yaml")
+    parser.add_argument("--video", help="recorded video to run through FingerTracker")
+    parser.add_argument("--max-frames", type=int, default=20000)
+    parser.add_argument("--tremor-hz", type=float, default=0.0)
+    parser.add_argument("--tremor-px", type=float, default=0.0)
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    report = run_headless(load_config(args.config), video=args.video, max_frames=args.max_frames,
+                          tremor_hz=args.tremor_hz, tremor_px=args.tremor_px)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Process-pool fingertip inference for several streams on one machine.
+
+Each stream gets a capture process that decodes frames straight into a
+multiprocessing.shared_memory ring. Tracker workers receive only (stream,
+slot, frame index, timestamp) messages, read the frame from shared memory and
+send back the fingertip (x, y, z), so whole frames are never pickled.
+
+FingerTracker is stateful (MediaPipe tracking, filter, keyframes), so every stream
+is pinned to one worker, which keeps one tracker per stream and sees that
+stream's frames in order. Workers beyond the number of streams would idle
+and are not started.
+
+Usage:
+    python inference_service.py clip1.mp4 clip2.mp4 --workers 4
+    python inference_service.py clip1.mp4 clip2.mp4 --workers 4 --sweep
+"""
+import argparse
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from camera_manager import CameraManager, open_source
+
+
+class SharedFrameRing:
+    def __init__(self, shape, slots=4, name=None):
+        """
+        Ring of fixed-size frame slots in shared memory.
+
+        Args:
+            shape: (height, width, channels) of every frame
+            slots: number of frames the ring can hold
+            name: attach to an existing ring instead of creating one
+        """
+        self.shape = tuple(shape)
+        self.slots = slots
+        frame_bytes = int(np.prod(self.shape))
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=frame_bytes * slots)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def spec(self):
+        return self.name, self.shape, self.slots
+
+    def close(self):
+        self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def probe_frame_shape(spec):
+    source = open_source(spec)
+    frame = source.read()
+    source.release()
+    if frame is None:
+        raise ValueError(f"Could not read a frame from {spec}")
+    return frame.shape
+
+
+def _capture_process(stream_id, source_spec, ring_spec, free_slots, tasks, results, drop_when_full):
+    name, shape, slots = ring_spec
+    ring = SharedFrameRing(shape, slots, name=name)
+    camera = CameraManager(source=source_spec)
+    frame_index = 0
+    dropped = 0
+    try:
+        while True:
+            frame = camera.get_frame()
+            if frame is None:
+                break
+            try:
+                slot = free_slots.get(block=not drop_when_full)
+            except queue.Empty:
+                dropped += 1  # every slot is still being processed
+                frame_index += 1
+                continue
+            if frame.shape != ring.shape:
+                frame = cv2.resize(frame, (ring.shape[1], ring.shape[0]))
+            ring.frames[slot] = frame
+            tasks.put((stream_id, slot, frame_index, camera.last_frame_time))
+            frame_index += 1
+    finally:
+        results.put(("done", stream_id, frame_index, dropped))
+        camera.release()
+        ring.close()
+
+
+def _worker_process(ring_specs, free_slots, tasks, results, tracker_factory):
+    rings = [SharedFrameRing(shape, slots, name=name) for name, shape, slots in ring_specs]
+    trackers = {}  # stream id -> tracker of the streams pinned to this worker
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            stream_id, slot, frame_index, captured_at = task
+            tracker = trackers.get(stream_id)
+            if tracker is None:
+                tracker = trackers[stream_id] = tracker_factory()
+            finger_pos = tracker.update(rings[stream_id].frames[slot])
+            free_slots[stream_id].put(slot)
+            results.put(("result", stream_id, frame_index, captured_at, finger_pos))
+    finally:
+        for ring in rings:
+            ring.close()
+
+
+def _default_tracker():
+    from finger_tracker import FingerTracker
+    return FingerTracker()
+
+
+class InferenceService:
+    def __init__(self, sources, num_workers=None, slots=4, drop_when_full=False,
+                 tracker_factory=_default_tracker):
+        """
+        Multi-stream fingertip inference over a process pool.
+
+        Args:
+            sources: frame source specs (camera indices, video files, image dirs)
+            num_workers: tracker processes (defaults to the CPU count, at most one per stream)
+            slots: shared-memory frames per stream
+            drop_when_full: drop new frames instead of waiting when every slot
+                of a stream is busy (use for live cameras)
+            tracker_factory: picklable callable building the tracker of each stream
+        """
+        self.sources = list(sources)
+        self.num_workers = max(1, min(num_workers or mp.cpu_count(), len(self.sources)))
+        self.slots = slots
+        self.drop_when_full = drop_when_full
+        self.tracker_factory = tracker_factory
+        self.ctx = mp.get_context("spawn")
+        self.rings = []
+        self.processes = []
+        self.frames_dropped = [0] * len(self.sources)
+
+    def start(self):
+        ctx = self.ctx
+        self.rings = [SharedFrameRing(probe_frame_shape(spec), self.slots) for spec in self.sources]
+        # one task queue per worker; stream i is always processed by worker i % num_workers
+        self.tasks = [ctx.Queue() for _ in range(self.num_workers)]
+        self.results_queue = ctx.Queue()
+        self.free_slots = []
+        for _ in self.sources:
+            free = ctx.Queue()
+            for slot in range(self.slots):
+                free.put(slot)
+            self.free_slots.append(free)
+
+        ring_specs = [ring.spec() for ring in self.rings]
+        self.workers = [
+            ctx.Process(target=_worker_process, daemon=True,
+                        args=(ring_specs, self.free_slots, tasks, self.results_queue,
+                              self.tracker_factory))
+            for tasks in self.tasks
+        ]
+        self.captures = [
+            ctx.Process(target=_capture_process, daemon=True,
+                        args=(i, spec, ring_specs[i], self.free_slots[i],
+                              self.tasks[i % self.num_workers],
+                              self.results_queue, self.drop_when_full))
+            for i, spec in enumerate(self.sources)
+        ]
+        self.processes = self.workers + self.captures
+        for process in self.processes:
+            process.start()
+
+    def _check_processes(self, produced):
+        for i, worker in enumerate(self.workers):
+            if not worker.is_alive():
+                raise RuntimeError(f"Inference worker {i} exited with code {worker.exitcode}")
+        for i, capture in enumerate(self.captures):
+            # a capture that exits normally always reports "done" first
+            if i not in produced and not capture.is_alive() and capture.exitcode != 0:
+                raise RuntimeError(f"Capture process of {self.sources[i]} exited with code {capture.exitcode}")
+
+    def results(self, poll_interval=1.0):
+        """
+        Yield (stream_id, frame_index, captured_at, finger_pos) until every stream ends.
+
+        Raises:
+            RuntimeError: a worker or capture process died before its stream ended
+        """
+        produced = {}
+        received = [0] * len(self.sources)
+        while len(produced) < len(self.sources) or any(
+                received[i] < produced[i] for i in produced):
+            try:
+                message = self.results_queue.get(timeout=poll_interval)
+            except queue.Empty:
+                self._check_processes(produced)
+                continue
+            if message[0] == "done":
+                _, stream_id, frame_count, dropped = message
+                produced[stream_id] = frame_count - dropped
+                self.frames_dropped[stream_id] = dropped
+                continue
+            _, stream_id, frame_index, captured_at, finger_pos = message
+            received[stream_id] += 1
+            yield stream_id, frame_index, captured_at, finger_pos
+
+    def stop(self):
+        for tasks in self.tasks:
+            tasks.put(None)
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for ring in self.rings:
+            ring.close()
+        self.rings = []
+
+    def run(self):
+        """Process every stream to the end; return per-stream results and elapsed seconds."""
+        per_stream = [[] for _ in self.sources]
+        start = time.perf_counter()
+        self.start()
+        try:
+            for stream_id, frame_index, captured_at, finger_pos in self.results():
+                per_stream[stream_id].append((frame_index, finger_pos))
+        finally:
+            self.stop()
+        elapsed = time.perf_counter() - start
+        for stream in per_stream:
+            stream.sort(key=lambda item: item[0])
+        return per_stream, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-stream fingertip inference benchmark")
+    parser.add_argument("sources", nargs="+", help="video files / image dirs standing in for cameras")
+    parser.add_argument("--workers", type=int, default=mp.cpu_count())
+    parser.add_argument("--slots", type=int, default=4)
+    parser.add_argument("--sweep", action="store_true",
+                        help="repeat the run with 1..workers processes to show scaling")
+    args = parser.parse_args()
+
+    worker_counts = range(1, args.workers + 1) if args.sweep else [args.workers]
+    for num_workers in worker_counts:
+        service = InferenceService(args.sources, num_workers=num_workers, slots=args.slots)
+        per_stream, elapsed = service.run()
+        frames = sum(len(stream) for stream in per_stream)
+        detected = sum(1 for stream in per_stream for _, pos in stream if pos is not None)
+        print(f"workers={num_workers:2d}  streams={len(args.sources)}  frames={frames}  "
+              f"detected={detected}  {elapsed:.2f}s  {frames / elapsed:.1f} fps")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Compare every-frame detection with adaptive keyframe tracking on recorded footage.
+
+Every-frame MediaPipe positions are the reference; the adaptive tracker is
+scored by throughput, keyframe fraction and fingertip error against them.
+
+Usage:
+    python keyframe_benchmark.py recording.mp4 [--budget-ms 15] [--max-interval 8]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from camera_manager import CameraManager
+from finger_tracker import FingerTracker
+
+
+def time_tracker(tracker, frames):
+    latencies = []
+    positions = []
+    for frame in frames:
+        start = time.perf_counter()
+        positions.append(tracker.update(frame))
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1000.0, positions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Every-frame vs adaptive keyframe fingertip tracking")
+    parser.add_argument("video")
+    parser.add_argument("--budget-ms", type=float, default=15.0)
+    parser.add_argument("--max-interval", type=int, default=8)
+    parser.add_argument("--max-frames", type=int, default=600)
+    args = parser.parse_args()
+
+    camera = CameraManager(source=args.video)
+    frames = []
+    while len(frames) < args.max_frames:
+        frame = camera.get_frame()
+        if frame is None:
+            break
+        frames.append(frame)
+    camera.release()
+    if not frames:
+        raise SystemExit(f"No frames read from {args.video}")
+
+    every_tracker = FingerTracker()
+    keyframe_tracker = FingerTracker(keyframe=True, frame_budget_ms=args.budget_ms,
+                                     max_keyframe_interval=args.max_interval)
+    every_tracker.load()
+    keyframe_tracker.load()
+    every_ms, every_pos = time_tracker(every_tracker, frames)
+    keyframe_ms, keyframe_pos = time_tracker(keyframe_tracker, frames)
+
+    print(f"{len(frames)} frames from {args.video}")
+    for label, ms in (("every", every_ms), ("adaptive", keyframe_ms)):
+        print(f"{label:>8}: {1000.0 / ms.mean():6.1f} fps  mean {ms.mean():6.2f} ms  "
+              f"p95 {np.percentile(ms, 95):6.2f} ms")
+    print(f"keyframes: {keyframe_tracker.keyframes}/{len(frames)} "
+          f"({keyframe_tracker.keyframes / len(frames):.0%}), "
+          f"final interval {keyframe_tracker.keyframe_interval}")
+
+    errors = np.array([np.hypot(a[0] - b[0], a[1] - b[1])
+                       for a, b in zip(every_pos, keyframe_pos) if a is not None and b is not None])
+    if errors.size:
+        print(f"fingertip error vs every-frame: mean {errors.mean():.1f} px, "
+              f"p95 {np.percentile(errors, 95):.1f} px, max {errors.max():.1f} px")
+
+
+if __name__ == "__main__":
+    main()
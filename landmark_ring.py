@@ -0,0 +1,50 @@
+import numpy as np
+
+
+class LandmarkRing:
+    def __init__(self, capacity=256, num_landmarks=21):
+        """
+        Fixed-size history of per-frame hand landmarks.
+
+        Every frame is written twice, at i and i + capacity, into storage of
+        twice the capacity. The most recent n frames are therefore always one
+        contiguous slice, and window() returns views without copying.
+
+        Args:
+            capacity: number of frames kept
+            num_landmarks: landmarks per frame (21 for MediaPipe Hands)
+        """
+        self.capacity = capacity
+        self._landmarks = np.full((2 * capacity, num_landmarks, 3), np.nan, dtype=np.float32)
+        self._t = np.zeros(2 * capacity, dtype=np.float64)
+        self._score = np.zeros(2 * capacity, dtype=np.float32)
+        self._pos = 0
+        self._count = 0
+
+    def push(self, t, landmarks, score=0.0):
+        """Append one frame; landmarks is a (num_landmarks, 3) array (NaN when no hand)."""
+        for i in (self._pos, self._pos + self.capacity):
+            self._landmarks[i] = landmarks
+            self._t[i] = t
+            self._score[i] = score
+        self._pos = (self._pos + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def __len__(self):
+        return self._count
+
+    def window(self, n=None):
+        """
+        Zero-copy views of the last n frames (all kept frames by default), oldest first.
+
+        Returns:
+            (t (n,), landmarks (n, num_landmarks, 3), score (n,)); the views are
+            overwritten by later pushes, so copy them to keep them
+        """
+        n = self._count if n is None else min(n, self._count)
+        end = self._pos + self.capacity
+        return self._t[end - n:end], self._landmarks[end - n:end], self._score[end - n:end]
+
+    def clear(self):
+        self._pos = 0
+        self._count = 0
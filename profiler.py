@@ -0,0 +1,162 @@
+import csv
+import json
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Profiler:
+    def __init__(self, enabled=False, hud=False, window=300, export_path=None, export_interval=10.0):
+        """
+        Named timing spans, rolling latency histograms and counters for the main loop.
+
+        When disabled, span() returns a shared no-op context manager and
+        count()/record() return immediately, so instrumentation can stay in place.
+
+        Args:
+            enabled: collect measurements
+            hud: draw the statistics onto the frame in draw_hud()
+            window: number of recent samples kept per span
+            export_path: .json or .csv file written every export_interval seconds
+            export_interval: seconds between periodic exports
+        """
+        self.enabled = enabled
+        self.hud = hud and enabled
+        self.window = window
+        self.export_path = export_path
+        self.export_interval = export_interval
+        self.spans = {}
+        self.counters = {}
+        self._last_export = time.monotonic()
+
+    @classmethod
+    def from_config(cls, profiling_cfg):
+        return cls(
+            enabled=profiling_cfg.get("enabled", False),
+            hud=profiling_cfg.get("hud", False),
+            window=profiling_cfg.get("window", 300),
+            export_path=profiling_cfg.get("export_path"),
+            export_interval=profiling_cfg.get("export_interval", 10.0),
+        )
+
+    def span(self, name):
+        """Context manager timing one stage: `with profiler.span("tracker"): ...`."""
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, name)
+
+    def record(self, name, seconds):
+        if not self.enabled:
+            return
+        samples = self.spans.get(name)
+        if samples is None:
+            samples = self.spans[name] = deque(maxlen=self.window)
+        samples.append(seconds)
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def stats(self):
+        """Per-span count/mean/p50/p95/p99 in milliseconds over the rolling window."""
+        result = {}
+        for name, samples in self.spans.items():
+            if not samples:
+                continue
+            ms = np.fromiter(samples, dtype=np.float64, count=len(samples)) * 1000.0
+            p50, p95, p99 = np.percentile(ms, (50, 95, 99))
+            result[name] = {"count": len(ms), "mean_ms": float(ms.mean()),
+                            "p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99)}
+        return result
+
+    def draw_hud(self, frame):
+        """Overlay span percentiles and counters in the top-left corner."""
+        if not self.hud:
+            return
+        lines = [f"{name:<8} p50 {s['p50_ms']:5.1f}  p95 {s['p95_ms']:5.1f}  p99 {s['p99_ms']:5.1f} ms"
+                 for name, s in self.stats().items()]
+        lines += [f"{name}: {value}" for name, value in self.counters.items()]
+        for i, line in enumerate(lines):
+            cv2.putText(frame, line, (10, 70 + 18 * i), cv2.FONT_HERSHEY_PLAIN, 1.0, (255, 255, 255), 1)
+
+    def maybe_export(self):
+        """Write the export file if export_interval has elapsed since the last write."""
+        if not self.enabled or not self.export_path:
+            return
+        now = time.monotonic()
+        if now - self._last_export >= self.export_interval:
+            self._last_export = now
+            self.export(self.export_path)
+
+    def export(self, path):
+        stats = self.stats()
+        timestamp = time.time()
+        if path.endswith(".csv"):
+            with open(path, "a", newline="") as f:
+                writer = csv.writer(f)
+                if f.tell() == 0:
+                    writer.writerow(["timestamp", "name", "count", "mean_ms", "p50_ms", "p95_ms", "p99_ms"])
+                for name, s in stats.items():
+                    writer.writerow([f"{timestamp:.3f}", name, s["count"], f"{s['mean_ms']:.4f}",
+                                     f"{s['p50_ms']:.4f}", f"{s['p95_ms']:.4f}", f"{s['p99_ms']:.4f}"])
+                for name, value in self.counters.items():
+                    writer.writerow([f"{timestamp:.3f}", name, value, "", "", "", ""])
+        else:
+            with open(path, "w") as f:
+                json.dump({"timestamp": timestamp, "spans": stats, "counters": self.counters}, f, indent=2)
+
+
+class StartupTimer:
+    def __init__(self):
+        """Collects the startup-time breakdown (imports, config, camera, model...)."""
+        self.phases = {}
+        self._last = time.perf_counter()
+
+    def mark(self, name):
+        """Record the time since the previous mark under name."""
+        now = time.perf_counter()
+        self.phases[name] = now - self._last
+        self._last = now
+
+    def add(self, name, seconds):
+        self.phases[name] = seconds
+
+    def report(self, log_path=None):
+        """Print the breakdown and optionally append it as a JSON line to log_path."""
+        print("Startup: " + ", ".join(f"{name} {seconds * 1000:.0f} ms"
+                                      for name, seconds in self.phases.items()))
+        if log_path:
+            with open(log_path, "a") as f:
+                f.write(json.dumps({"timestamp": time.time(), **self.phases}) + "\n")
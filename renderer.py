@@ -1,20 +1,43 @@
+from collections import OrderedDict
+
 import cv2
 import numpy as np
+
+
 class Renderer:
+    # Map logical colors to BGR values
+    COLORS = {
+        'yellow': (0, 255, 255),
+        'red': (0, 0, 255),
+        'blue': (255, 0, 0),
+        'green': (0, 255, 0),
+        'gray': (128, 128, 128)
+    }
+
+    def __init__(self, scene_cache_size=8):
+        """
+        Args:
+            scene_cache_size: rendered scenes kept, so the spiral colour flipping with
+                depth jitter reuses its layers instead of redrawing them
+        """
+        # Cached layers, composed bottom to top with masked copies:
+        #   base  - spiral and instruction text (per scene, cached by scene key)
+        #   trace - the finger trace, drawn incrementally and independent of the scene
+        #   top   - start/end circles, drawn over the trace as before the compositor
+        self.scene_cache_size = scene_cache_size
+        self._scenes = OrderedDict()  # scene key -> (base, base_mask, top, top_mask)
+        self._scene_key = None
+        self._scene = None
+        self._trace = None
+        self._trace_mask = None
+        self._trace_source = None
+        self._trace_drawn = 0
+
     def draw_spiral(self, frame, spiral, finger_depth_color='yellow'):
-        points = spiral.path_points
-        cv2.polylines(frame, [np.array(points, dtype=np.int32)], False, self.color_map(finger_depth_color), thickness=5)
+        cv2.polylines(frame, [spiral.path_array], False, self.color_map(finger_depth_color), thickness=5)
 
     def color_map(self, color_name):
-        # Map logical colors to BGR values
-        colors = {
-            'yellow': (0, 255, 255),
-            'red': (0, 0, 255),
-            'blue': (255, 0, 0),
-            'green': (0, 255, 0),
-            'gray': (128, 128, 128)
-        }
-        return colors.get(color_name, (0, 255, 255))
+        return self.COLORS.get(color_name, (0, 255, 255))
 
     def draw_trace(self, frame, trace_points):
         if len(trace_points) > 1:
@@ -22,6 +45,91 @@ class Renderer:
             cv2.polylines(frame, [np.array(pts, np.int32)], False, (0,0,255), thickness=3)
 
 
+    def set_scene(self, frame, spiral=None, finger_depth_color=None, text=None, circles=()):
+        """
+        Describe the static part of the picture; layers are re-rendered only when it changes.
+
+        Args:
+            frame: frame the layers will be composed onto (only its shape is used)
+            spiral: spiral to draw, or None
+            finger_depth_color: logical spiral color ('green', 'red', ...)
+            text: instruction text shown top-center, or None
+            circles: tuple of (center, radius, bgr_color) start/end circles
+        """
+        key = (frame.shape, spiral, finger_depth_color, text, tuple(circles))
+        if key == self._scene_key:
+            return
+        self._scene_key = key
+        if self._trace is None or self._trace.shape != frame.shape:
+            self._trace = np.zeros(frame.shape, dtype=np.uint8)
+            self._trace_mask = np.zeros(frame.shape[:2], dtype=np.uint8)
+            self._trace_drawn = 0
+
+        scene = self._scenes.get(key)
+        if scene is not None:
+            self._scenes.move_to_end(key)
+            self._scene = scene
+            return
+
+        base = np.zeros(frame.shape, dtype=np.uint8)
+        base_mask = np.zeros(frame.shape[:2], dtype=np.uint8)
+        if spiral is not None:
+            pts = [spiral.path_array]
+            cv2.polylines(base, pts, False, self.color_map(finger_depth_color), thickness=5)
+            cv2.polylines(base_mask, pts, False, 255, thickness=5)
+        if text:
+            text_x = frame.shape[1] // 2 - len(text) * 6
+            cv2.putText(base, text, (text_x, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 0, 0), 2)
+            cv2.putText(base_mask, text, (text_x, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.8, 255, 2)
+        top = top_mask = None
+        if circles:
+            top = np.zeros(frame.shape, dtype=np.uint8)
+            top_mask = np.zeros(frame.shape[:2], dtype=np.uint8)
+            for center, radius, color in circles:
+                center = (int(center[0]), int(center[1]))
+                cv2.circle(top, center, radius, color, 2)
+                cv2.circle(top_mask, center, radius, 255, 2)
+        self._scene = self._scenes[key] = (base, base_mask, top, top_mask)
+        if len(self._scenes) > self.scene_cache_size:
+            self._scenes.popitem(last=False)
+
+    def update_trace(self, trace_points, generation=None):
+        """
+        Draw only the trace segments appended since the last call.
+
+        The trace has its own layer, so scene changes never force it to be redrawn.
+
+        Args:
+            trace_points: (N, 2+) points (array view or list of tuples), None hides the trace
+            generation: TraceManager.generation; a change means the trace was cleared
+        """
+        if trace_points is None:
+            trace_points = ()
+            generation = None
+        if generation != self._trace_source or len(trace_points) < self._trace_drawn:
+            if self._trace_drawn:
+                self._trace.fill(0)
+                self._trace_mask.fill(0)
+                self._trace_drawn = 0
+            self._trace_source = generation
+        start = max(self._trace_drawn - 1, 0)
+        if self._trace is not None and len(trace_points) - start > 1:
+            pts = [np.asarray(trace_points[start:])[:, :2].astype(np.int32)]
+            cv2.polylines(self._trace, pts, False, (0, 0, 255), thickness=3)
+            cv2.polylines(self._trace_mask, pts, False, 255, thickness=3)
+            self._trace_drawn = len(trace_points)
+
+    def compose(self, frame):
+        """Copy the cached layers onto the frame: base, trace, then circles on top."""
+        if self._scene is None:
+            return
+        base, base_mask, top, top_mask = self._scene
+        cv2.copyTo(base, base_mask, frame)
+        if self._trace_drawn:
+            cv2.copyTo(self._trace, self._trace_mask, frame)
+        if top is not None:
+            cv2.copyTo(top, top_mask, frame)
+
     def draw_reference_dot(self, frame, position):
         cv2.circle(frame, position, 8, (255, 255, 0), -1)  # cyan circle
 
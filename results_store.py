@@ -0,0 +1,317 @@
+"""
+Local SQLite store of assessment results.
+
+Patients, sessions, per-spiral summary metrics (the batch_scoring columns) and
+optional downsampled traces live in one WAL-mode database. Live sessions are
+written by a background thread in batched transactions; historical session
+logs are scored with batch_scoring and inserted in a single transaction.
+Tremor values are batch_scoring's whole-trace estimates (TREMOR_METHOD).
+
+Usage:
+    python results_store.py import sessions/*.tlog --patient P001
+    python results_store.py history P001 --from 2026-01-01 --to 2026-12-31
+"""
+import argparse
+import json
+import os
+import queue
+import sqlite3
+import threading
+
+import numpy as np
+
+from batch_scoring import FLOAT_COLUMNS, load_session_traces, score_jobs
+from session_log import read_session
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS patients (
+    id INTEGER PRIMARY KEY,
+    code TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    patient_id INTEGER REFERENCES patients(id),
+    started_at TEXT,
+    source TEXT UNIQUE,
+    metadata TEXT
+);
+CREATE TABLE IF NOT EXISTS spiral_results (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    spiral TEXT NOT NULL,
+    samples INTEGER,
+    {", ".join(f"{name} REAL" for name in FLOAT_COLUMNS)}
+);
+CREATE TABLE IF NOT EXISTS traces (
+    spiral_result_id INTEGER PRIMARY KEY REFERENCES spiral_results(id) ON DELETE CASCADE,
+    points INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_patient_date ON sessions(patient_id, started_at);
+CREATE INDEX IF NOT EXISTS sessions_date ON sessions(started_at);
+CREATE INDEX IF NOT EXISTS spiral_results_session ON spiral_results(session_id, spiral);
+"""
+
+RESULT_COLUMNS = ["samples"] + FLOAT_COLUMNS
+
+
+def connect(path):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def downsample(trace, points):
+    """Evenly spaced subset of at most points rows, as float32."""
+    trace = np.asarray(trace, dtype=np.float32)
+    if points is None or len(trace) <= points:
+        return trace
+    return trace[np.linspace(0, len(trace) - 1, points).round().astype(int)]
+
+
+def _patient_id(conn, code, cache):
+    if code is None:
+        return None
+    if code not in cache:
+        conn.execute("INSERT OR IGNORE INTO patients (code) VALUES (?)", (code,))
+        cache[code] = conn.execute("SELECT id FROM patients WHERE code = ?", (code,)).fetchone()[0]
+    return cache[code]
+
+
+def insert_sessions(conn, sessions, trace_points=200):
+    """
+    Insert scored sessions in the current transaction.
+
+    Args:
+        conn: connection from connect()
+        sessions: iterable of dicts with 'patient', 'source', 'metadata' and
+            'spirals' (name -> (result dict of RESULT_COLUMNS, (N, 3) t/x/y trace or None))
+        trace_points: traces are downsampled to this many points (0 = store no traces)
+    """
+    patients = {}
+    for session in sessions:
+        metadata = session.get("metadata") or {}
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO sessions (patient_id, started_at, source, metadata) VALUES (?, ?, ?, ?)",
+            (_patient_id(conn, session.get("patient"), patients), metadata.get("started_at"),
+             session.get("source"), json.dumps(metadata)))
+        if cursor.rowcount == 0:
+            continue  # source already imported
+        session_id = cursor.lastrowid
+        for name, (result, trace) in session["spirals"].items():
+            values = [None if value is None or value != value else float(value)
+                      for value in (result.get(column) for column in RESULT_COLUMNS)]
+            result_id = conn.execute(
+                f"INSERT INTO spiral_results (session_id, spiral, {', '.join(RESULT_COLUMNS)}) "
+                f"VALUES (?, ?, {', '.join('?' * len(RESULT_COLUMNS))})",
+                [session_id, name] + values).lastrowid
+            if trace_points and trace is not None and len(trace):
+                small = downsample(trace, trace_points)
+                conn.execute("INSERT INTO traces (spiral_result_id, points, data) VALUES (?, ?, ?)",
+                             (result_id, len(small), small.tobytes()))
+
+
+def score_logs(paths, patient=None, workers=None, tremor_cfg=None):
+    """
+    Score session logs with batch_scoring; returns session dicts for insert_sessions().
+
+    Sessions without any scored tracing (e.g. abandoned before the first spiral)
+    are returned too, with no spirals, so they are still recorded.
+    """
+    tremor_cfg = tremor_cfg or {}
+    jobs = load_session_traces(paths)
+    columns = score_jobs(jobs, workers=workers, sample_rate=tremor_cfg.get("sample_rate", 60.0),
+                         band=tuple(tremor_cfg.get("band", (3.0, 12.0))))
+    sessions = {}
+    for path in paths:
+        metadata, _ = read_session(path)
+        sessions[path] = {"patient": patient, "source": os.path.abspath(path),
+                          "metadata": metadata, "spirals": {}}
+    for row, (path, name, _, trace, _) in enumerate(jobs):
+        sessions[path]["spirals"][name] = ({column: columns[column][row] for column in RESULT_COLUMNS}, trace)
+    return list(sessions.values())
+
+
+class ResultsStore:
+    def __init__(self, path="results.db", trace_points=200, batch_size=32):
+        """
+        Results database with a background writer thread.
+
+        Args:
+            path: SQLite database file (created with its schema if missing)
+            trace_points: points kept per stored trace (0 = no traces)
+            batch_size: queued sessions committed per transaction at most
+        """
+        self.path = path
+        self.trace_points = trace_points
+        self.batch_size = batch_size
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connect(path).close()  # create the schema before any reader opens the file
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_config(cls, store_cfg):
+        return cls(
+            path=store_cfg.get("path", "results.db"),
+            trace_points=store_cfg.get("trace_points", 200),
+            batch_size=store_cfg.get("batch_size", 32),
+        )
+
+    def add_session(self, session):
+        """Queue one session dict (see insert_sessions); never blocks on disk."""
+        self._queue.put(("session", session))
+
+    def add_session_log(self, log_path, patient=None, tremor_cfg=None):
+        """Queue a finished session log; it is scored and stored on the writer thread."""
+        self._queue.put(("log", (log_path, patient, tremor_cfg)))
+
+    def _write_loop(self):
+        conn = connect(self.path)
+        closing = False
+        while not closing:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if batch[-1] is None:
+                closing = True
+                batch.pop()
+            try:
+                self._write_batch(conn, batch)
+            except Exception as exc:  # keep the thread alive for the rest of the queue
+                print(f"⚠️ Could not store {len(batch)} queued results in {self.path}: {exc}")
+        conn.close()
+
+    def _write_batch(self, conn, batch):
+        sessions = []
+        for kind, item in batch:
+            if kind == "log":
+                log_path, patient, tremor_cfg = item
+                try:
+                    sessions += score_logs([log_path], patient, workers=0, tremor_cfg=tremor_cfg)
+                except Exception as exc:  # one unreadable log must not cost the rest of the batch
+                    print(f"⚠️ Could not store results of {log_path}: {exc}")
+            else:
+                sessions.append(item)
+        if sessions:
+            with conn:
+                insert_sessions(conn, sessions, self.trace_points)
+
+    def close(self):
+        """Write everything still queued and stop the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+
+def import_logs(db_path, paths, patient=None, workers=None, trace_points=200, tremor_cfg=None):
+    """
+    Bulk-load historical session logs; already imported files are skipped.
+
+    Returns:
+        number of sessions inserted
+    """
+    conn = connect(db_path)
+    try:
+        known = {row[0] for row in conn.execute("SELECT source FROM sessions")}
+        todo = [path for path in paths if os.path.abspath(path) not in known]
+        if not todo:
+            return 0
+        sessions = score_logs(todo, patient, workers=workers, tremor_cfg=tremor_cfg)
+        with conn:
+            insert_sessions(conn, sessions, trace_points)
+        return len(sessions)
+    finally:
+        conn.close()
+
+
+def patient_history(db_path, patient, start=None, end=None, spiral=None):
+    """
+    Longitudinal results of one patient, oldest first.
+
+    Args:
+        start, end: inclusive ISO date bounds on the session start (e.g. "2026-01-31")
+        spiral: restrict to one spiral name ("main" / "small")
+
+    Returns:
+        list of dicts with started_at, spiral and the RESULT_COLUMNS; a session
+        without any scored spiral appears once with spiral and results None
+    """
+    query = (f"SELECT s.started_at, r.spiral, {', '.join('r.' + c for c in RESULT_COLUMNS)} "
+             "FROM sessions s JOIN patients p ON p.id = s.patient_id "
+             "LEFT JOIN spiral_results r ON r.session_id = s.id WHERE p.code = ?")
+    params = [patient]
+    if start:
+        query += " AND s.started_at >= ?"
+        params.append(start)
+    if end:
+        query += " AND s.started_at < date(?, '+1 day')"  # inclusive of the whole end day
+        params.append(end)
+    if spiral:
+        query += " AND r.spiral = ?"
+        params.append(spiral)
+    query += " ORDER BY s.started_at, r.spiral"
+    conn = connect(db_path)
+    try:
+        names = ["started_at", "spiral"] + RESULT_COLUMNS
+        return [dict(zip(names, row)) for row in conn.execute(query, params)]
+    finally:
+        conn.close()
+
+
+def load_trace(db_path, spiral_result_id):
+    """Stored (N, 3) float32 t/x/y trace of one spiral result, or None."""
+    conn = connect(db_path)
+    try:
+        row = conn.execute("SELECT points, data FROM traces WHERE spiral_result_id = ?",
+                           (spiral_result_id,)).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    return np.frombuffer(row[1], dtype=np.float32).reshape(row[0], 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Results store tools")
+    parser.add_argument("--db", default="results.db")
+    sub = parser.add_subparsers(dest="command", required=True)
+    import_parser = sub.add_parser("import", help="bulk-load session logs")
+    import_parser.add_argument("sessions", nargs="+")
+    import_parser.add_argument("--patient")
+    import_parser.add_argument("--workers", type=int, default=None)
+    import_parser.add_argument("--trace-points", type=int, default=200)
+    history_parser = sub.add_parser("history", help="results of one patient over time")
+    history_parser.add_argument("patient")
+    history_parser.add_argument("--from", dest="start")
+    history_parser.add_argument("--to", dest="end")
+    history_parser.add_argument("--spiral")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        tremor_cfg = {}
+        if os.path.exists("config.yaml"):
+            from config_loader import load_config
+            tremor_cfg = load_config("config.yaml").get("tremor", {})
+        count = import_logs(args.db, args.sessions, args.patient, args.workers, args.trace_points, tremor_cfg)
+        print(f"Imported {count} sessions into {args.db} ({len(args.sessions) - count} skipped)")
+    else:
+        for row in patient_history(args.db, args.patient, args.start, args.end, args.spiral):
+            tremor = row["tremor_frequency"]
+            if row["spiral"] is None:
+                print(f"{row['started_at']}  no completed spiral")
+                continue
+            print(f"{row['started_at']}  {row['spiral']:<5}  deviation {row['deviation_mean'] or 0:.1f}px  "
+                  f"tremor {tremor or 0:.1f} Hz  time {row['completion_time'] or 0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import time
+
+
+class ManualClock:
+    def __init__(self, start=0.0):
+        """Clock that only moves when advanced, for deterministic runs and tests."""
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class FixedTimestepScheduler:
+    def __init__(self, tick_rate=60.0, clock=time.monotonic, max_frame_time=0.25):
+        """
+        Turns variable frame times into a whole number of fixed simulation ticks.
+
+        Game progression (dot progress, countdowns, step timers, state
+        transitions) runs in ticks of exactly 1 / tick_rate seconds, so it
+        advances at the same speed however slow rendering or inference is.
+
+        Args:
+            tick_rate: simulation ticks per second
+            clock: monotonic time source (seconds)
+            max_frame_time: longest frame gap that is caught up; longer stalls
+                (e.g. a debugger pause) are clamped instead of replayed
+        """
+        self.dt = 1.0 / tick_rate
+        self.clock = clock
+        self.max_frame_time = max_frame_time
+        self.ticks = 0
+        self._accumulator = 0.0
+        self._last = None
+
+    @property
+    def time(self):
+        """Simulation time in seconds (ticks * dt)."""
+        return self.ticks * self.dt
+
+    @property
+    def alpha(self):
+        """Fraction of a tick left in the accumulator, for render interpolation."""
+        return self._accumulator / self.dt
+
+    def advance(self):
+        """
+        Measure the time since the last call and yield the simulation time of
+        every tick that is now due (zero or more; several when a frame was late).
+        """
+        now = self.clock()
+        if self._last is None:
+            self._last = now
+            return
+        frame_time = min(max(now - self._last, 0.0), self.max_frame_time)
+        self._last = now
+        self._accumulator += frame_time
+        # small epsilon so accumulated float error does not drop a tick
+        due = int((self._accumulator + 1e-9) // self.dt)
+        self._accumulator = max(self._accumulator - due * self.dt, 0.0)
+        for _ in range(due):
+            self.ticks += 1
+            yield self.time
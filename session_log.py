@@ -0,0 +1,218 @@
+"""
+Append-only binary session log and replay.
+
+A log file is a fixed-size header (magic, sizes and JSON metadata) followed by
+fixed-size records, one per frame. The writer appends from a background thread
+so the frame loop never waits on disk; the reader memory-maps the records as a
+NumPy structured array without parsing.
+
+Usage:
+    python session_log.py replay sessions/session_20261017_101500.tlog
+"""
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from game_state import GameState
+from spiral import Spiral
+from tremor_analysis import TremorAnalyzer
+
+MAGIC = b"TRMSLOG1"
+HEADER_SIZE = 1024
+
+RECORD_DTYPE = np.dtype([
+    ("t", "<f8"),          # time.monotonic() seconds
+    ("step", "<i2"),
+    ("state", "<i2"),      # GameState value
+    ("x", "<f4"),          # fingertip, NaN when not detected
+    ("y", "<f4"),
+    ("z", "<f4"),
+    ("ref_x", "<f4"),      # reference dot, NaN when not shown
+    ("ref_y", "<f4"),
+    ("depth", "u1"),       # DEPTH_CODES
+])
+
+DEPTH_CODES = {None: 0, 'gray': 1, 'green': 2, 'red': 3, 'blue': 4}
+DEPTH_NAMES = {code: name for name, code in DEPTH_CODES.items()}
+
+# tracing steps and the spiral they are scored against, for logs written
+# before the protocol was stored in the metadata
+TRACING_STEPS = {4: "main", 6: "small"}
+# and the direction of each tracing, for logs written before it was stored
+TRACING_DIRECTIONS = {"main": "forward", "small": "reverse"}
+
+
+def _pack_header(metadata):
+    meta = json.dumps(metadata).encode("utf-8")
+    prefix = MAGIC + np.array([HEADER_SIZE, RECORD_DTYPE.itemsize, len(meta)], "<u4").tobytes()
+    if len(prefix) + len(meta) > HEADER_SIZE:
+        raise ValueError("Session metadata too large for the log header")
+    return (prefix + meta).ljust(HEADER_SIZE, b"\0")
+
+
+class SessionLogWriter:
+    def __init__(self, path, metadata=None, batch_size=64):
+        """
+        Append frame records to a session log from a background thread.
+
+        Args:
+            path: output .tlog file (created, or appended to if it exists)
+            metadata: JSON-serialisable dict stored in the header (e.g. spiral specs)
+            batch_size: records written per write() call at most
+        """
+        self.path = path
+        self.batch_size = batch_size
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "ab")
+        if new_file:
+            self._file.write(_pack_header(metadata or {}))
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+
+    def log(self, t, step, state, finger_pos=None, reference_dot=None, depth_color=None):
+        """Queue one record; never blocks on disk."""
+        x, y, z = finger_pos if finger_pos is not None else (np.nan, np.nan, np.nan)
+        rx, ry = reference_dot if reference_dot is not None else (np.nan, np.nan)
+        self._queue.put((t, step, state, x, y, z, rx, ry, DEPTH_CODES.get(depth_color, 0)))
+
+    def _write_loop(self):
+        closing = False
+        while not closing:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if batch[-1] is None:
+                closing = True
+                batch.pop()
+            if batch:
+                self._file.write(np.array(batch, dtype=RECORD_DTYPE).tobytes())
+                self._file.flush()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+
+
+def read_session(path):
+    """
+    Memory-map a session log.
+
+    Returns:
+        (metadata dict, records) where records is a read-only structured array
+        view of RECORD_DTYPE (a trailing partial record is ignored)
+    """
+    with open(path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+    if header[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a session log")
+    header_size, record_size, meta_len = np.frombuffer(header, "<u4", count=3, offset=len(MAGIC))
+    if record_size != RECORD_DTYPE.itemsize:
+        raise ValueError(f"{path} has {record_size}-byte records, expected {RECORD_DTYPE.itemsize}")
+    start = len(MAGIC) + 12
+    metadata = json.loads(header[start:start + meta_len].decode("utf-8"))
+
+    count = (os.path.getsize(path) - header_size) // record_size
+    if count == 0:
+        return metadata, np.zeros(0, dtype=RECORD_DTYPE)
+    records = np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=int(header_size), shape=(int(count),))
+    return metadata, records
+
+
+def session_spirals(metadata):
+    """Rebuild the session's spirals from the specs stored in its metadata."""
+    return {name: Spiral(**spec) for name, spec in metadata.get("spirals", {}).items()}
+
+
+def session_tracing_steps(metadata):
+    """Step index -> spiral name of every scored tracing of a session."""
+    steps = metadata.get("tracing_steps")
+    if not steps:
+        return TRACING_STEPS
+    return {int(step): name for step, name in steps.items()}
+
+
+def session_reverse_tracings(metadata):
+    """Names of the session's tracings drawn from the outer end to the centre."""
+    directions = metadata.get("directions") or TRACING_DIRECTIONS
+    return {name for name, direction in directions.items() if direction == "reverse"}
+
+
+def score_session(records, spirals, tremor_cfg=None, tracing_steps=TRACING_STEPS):
+    """
+    Run recorded samples through the live scoring code (deviation + tremor).
+
+    Args:
+        tracing_steps: step index -> spiral name, from session_tracing_steps()
+
+    Returns:
+        dict spiral name -> {"deviation": ..., "tremor": ..., "duration": seconds}
+    """
+    scores = {}
+    for step, name in tracing_steps.items():
+        if name not in spirals:
+            continue
+        rows = records[(records["step"] == step) & (records["state"] == GameState.TRACING)]
+        rows = rows[~np.isnan(rows["x"])]
+        game_state = GameState()
+        game_state.state = GameState.TRACING
+        tremor = TremorAnalyzer.from_config(tremor_cfg or {})
+        spiral = spirals[name]
+        for t, x, y, z in zip(rows["t"].tolist(), rows["x"].tolist(),
+                              rows["y"].tolist(), rows["z"].tolist()):
+            game_state.update_deviation((x, y, z), spiral)
+            tremor.add_sample(t, x, y)
+        scores[name] = {
+            "deviation": game_state.deviation_summary(),
+            "tremor": tremor.result(),
+            "duration": float(rows["t"][-1] - rows["t"][0]) if len(rows) else 0.0,
+        }
+    return scores
+
+
+def replay(path, tremor_cfg=None):
+    metadata, records = read_session(path)
+    start = time.perf_counter()
+    scores = score_session(records, session_spirals(metadata), tremor_cfg, session_tracing_steps(metadata))
+    elapsed = time.perf_counter() - start
+    session_seconds = float(records["t"][-1] - records["t"][0]) if len(records) else 0.0
+    return metadata, records, scores, elapsed, session_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Session log tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    replay_parser = sub.add_parser("replay", help="re-score a recorded session")
+    replay_parser.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "replay":
+        from config_loader import load_config
+        tremor_cfg = load_config("config.yaml").get("tremor", {}) if os.path.exists("config.yaml") else {}
+        metadata, records, scores, elapsed, session_seconds = replay(args.path, tremor_cfg)
+        print(f"{len(records)} records, {session_seconds:.1f}s session replayed in {elapsed:.3f}s "
+              f"({session_seconds / max(elapsed, 1e-9):.0f}x real time)")
+        for name, score in scores.items():
+            dev = score["deviation"]
+            print(f"{name}: {dev['samples']} samples, deviation mean {dev['mean']:.1f}px "
+                  f"rms {dev['rms']:.1f}px max {dev['max']:.1f}px", end="")
+            tremor = score["tremor"]
+            if tremor is not None:
+                print(f", tremor {tremor['frequency']:.1f} Hz {tremor['amplitude']:.1f}px", end="")
+            print()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,73 @@
+import hashlib
+import os
+from collections import OrderedDict
+
+import cv2
 import numpy as np
 
+
+class GeometryCache:
+    def __init__(self, maxsize=32, cache_dir=None):
+        """
+        LRU cache of spiral geometry arrays, optionally backed by .npz files.
+
+        Args:
+            maxsize: number of geometries kept in memory
+            cache_dir: directory for the on-disk store (None = memory only)
+        """
+        self.maxsize = maxsize
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+
+    def _disk_path(self, key):
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"spiral_{digest}.npz")
+
+    def get(self, key):
+        """Return the cached dict of arrays for key, or None."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+        if self.cache_dir and os.path.exists(self._disk_path(key)):
+            with np.load(self._disk_path(key)) as data:
+                entry = {name: data[name] for name in data.files}
+            self._store(key, entry)
+        return entry
+
+    def put(self, key, entry):
+        """Insert or extend an entry; also written to disk when a cache_dir is set."""
+        entry = {**self._entries.get(key, {}), **entry}
+        for array in entry.values():
+            array.setflags(write=False)  # shared between Spiral instances
+        self._store(key, entry)
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = self._disk_path(key) + ".tmp.npz"
+            np.savez(tmp_path, **entry)
+            os.replace(tmp_path, self._disk_path(key))
+        return entry
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+GEOMETRY_CACHE = GeometryCache()
+
+
+def configure_geometry_cache(maxsize=32, cache_dir=None):
+    """Replace the shared geometry cache (called once from main with config values)."""
+    global GEOMETRY_CACHE
+    GEOMETRY_CACHE = GeometryCache(maxsize=maxsize, cache_dir=cache_dir)
+    return GEOMETRY_CACHE
+
+
 class Spiral:
     def __init__(self, center=(320, 240), inner_radius=0, outer_radius=200, turns=2, num_points=500):
         """
@@ -17,12 +85,32 @@ class Spiral:
         self.inner_radius = inner_radius
         self.turns = turns
         self.num_points = max(num_points, 2)
-        self.path_points = []
-        self._generate_path()
+        self.cache_key = (tuple(center), outer_radius, turns, self.num_points)
+        self._distance_index = None
 
-    def _generate_path(self):
-        self.path_points = []
+        entry = GEOMETRY_CACHE.get(self.cache_key)
+        if entry is None:
+            entry = GEOMETRY_CACHE.put(self.cache_key, {"path": self._generate_path()})
+        self._load_cached_index(entry)
+        # int32 (N, 2) array, ready for cv2.polylines
+        self.path_array = entry["path"]
+        # tuple view kept for compatibility
+        self.path_points = list(map(tuple, self.path_array.tolist()))
+        if self._distance_index is None:
+            # built here (once per geometry) rather than on the first tracing frame
+            self._build_distance_index()
+
+    def spec(self):
+        """Constructor arguments that rebuild this spiral (JSON-serialisable)."""
+        return {
+            "center": [int(c) for c in self.center],
+            "inner_radius": self.inner_radius,
+            "outer_radius": self.outer_radius,
+            "turns": self.turns,
+            "num_points": self.num_points,
+        }
 
+    def _generate_path(self):
         # Create a very fine theta array
         theta_fine = np.linspace(0, 2 * np.pi * self.turns, self.num_points * 10)
         r_fine = (theta_fine / (2 * np.pi * self.turns)) * self.outer_radius
@@ -43,11 +131,143 @@ class Spiral:
         theta_uniform = np.interp(s_uniform, s_cum, theta_fine)
         r_uniform = (theta_uniform / (2 * np.pi * self.turns)) * self.outer_radius
 
-        for r, t in zip(r_uniform, theta_uniform):
-            x = int(self.center[0] + r * np.cos(t))
-            y = int(self.center[1] + r * np.sin(t))
-            self.path_points.append((x, y))
+        path = np.empty((self.num_points, 2), dtype=np.float64)
+        path[:, 0] = self.center[0] + r_uniform * np.cos(theta_uniform)
+        path[:, 1] = self.center[1] + r_uniform * np.sin(theta_uniform)
+        return path.astype(np.int32)  # truncates like int()
+
+    def _load_cached_index(self, entry):
+        if "index_grid" in entry:
+            self._distance_index = {
+                name[len("index_"):]: entry[name] for name in entry if name.startswith("index_")
+            }
+
+    def _build_distance_index(self, cell_size=4, reach=2):
+        """
+        Precompute a nearest-vertex lookup grid around the path (once per geometry).
+
+        The path is rasterized into a grid of cell_size pixels and
+        cv2.distanceTransformWithLabels assigns every cell the nearest path
+        cell, so the cost grows with the grid area and path length only, not
+        with area times num_points. Each cell then keeps the nearest of the
+        vertices labelled within `reach` cells of it, which corrects the
+        approximate chamfer metric. A query refines against the segments
+        around the stored vertex; the refinement window spans a few cells of
+        arc length, which absorbs the cell quantization. Midway between two
+        arms the candidate can be off by up to one cell diagonal.
+        """
+        pts = self.path_array.astype(np.float64)
+        seg = pts[1:] - pts[:-1]
+        seg_len = np.sqrt((seg ** 2).sum(axis=1))
+        arc = np.concatenate(([0.0], np.cumsum(seg_len)))
+
+        margin = max(self.outer_radius * 0.5, 4 * cell_size)
+        origin = pts.min(axis=0) - margin
+        shape = np.ceil((pts.max(axis=0) + margin - origin) / cell_size).astype(int) + 1
+
+        # sample every segment at half-cell steps so the raster has no gaps
+        # between sparse vertices; each sample remembers its segment's first vertex
+        steps = np.maximum(np.ceil(seg_len / (cell_size / 2)).astype(int), 1)
+        vertex = np.repeat(np.arange(len(seg)), steps)
+        offset = np.arange(len(vertex)) - np.repeat(np.cumsum(steps) - steps, steps)
+        samples = pts[vertex] + seg[vertex] * (offset / steps[vertex])[:, None]
+        samples = np.vstack((samples, pts[-1:]))
+        vertex = np.append(vertex, len(pts) - 1)
+
+        # one zero pixel per cell the path passes through, holding one of its vertices
+        path_cells = np.floor((samples - origin) / cell_size).astype(int)
+        flat_cells = np.ravel_multi_index((path_cells[:, 0], path_cells[:, 1]), shape)
+        vertex_of_cell = np.zeros(shape[0] * shape[1], dtype=np.int32)
+        vertex_of_cell[flat_cells] = vertex
+        raster = np.ones(shape, dtype=np.uint8)
+        raster.flat[flat_cells] = 0
+        # DIST_LABEL_PIXEL numbers the zero pixels 1, 2, ... in row-major order
+        _, labels = cv2.distanceTransformWithLabels(raster, cv2.DIST_L2, 5, labelType=cv2.DIST_LABEL_PIXEL)
+        zero_cells = np.flatnonzero(raster.ravel() == 0)
+        nearest = vertex_of_cell[zero_cells[labels.ravel() - 1]].reshape(shape)
+
+        # the chamfer metric is approximate, so a cell can be labelled a few
+        # cells along the arm (or across the boundary between two arms) from
+        # its true nearest vertex: take the nearest of the labels around it
+        px, py = pts[:, 0].astype(np.float32), pts[:, 1].astype(np.float32)
+        cx = (origin[0] + (np.arange(shape[0]) + 0.5) * cell_size).astype(np.float32)[:, None]
+        cy = (origin[1] + (np.arange(shape[1]) + 0.5) * cell_size).astype(np.float32)[None, :]
+        padded = np.pad(nearest, reach, mode="edge")
+        best = nearest.copy()
+        best_d2 = (px[best] - cx) ** 2 + (py[best] - cy) ** 2
+        for dx in range(-reach, reach + 1):
+            for dy in range(-reach, reach + 1):
+                candidate = padded[reach + dx:reach + dx + shape[0], reach + dy:reach + dy + shape[1]]
+                d2 = (px[candidate] - cx) ** 2 + (py[candidate] - cy) ** 2
+                closer = d2 < best_d2
+                np.copyto(best, candidate, where=closer)
+                np.copyto(best_d2, d2, where=closer)
+
+        spacing = arc[-1] / max(len(pts) - 1, 1)
+        window = max(4, int(np.ceil(3 * cell_size / spacing))) if spacing > 0 else 4
+        index = {
+            "pts": pts,
+            "seg": seg,
+            "seg_len2": np.maximum(seg_len ** 2, 1e-12),
+            "arc": arc,
+            "origin": origin,
+            "cell": np.float64(cell_size),
+            "window": np.int64(window),
+            "grid": best.astype(np.int32),
+        }
+        entry = GEOMETRY_CACHE.put(self.cache_key, {"index_" + name: value for name, value in index.items()})
+        self._load_cached_index(entry)
+
+    def nearest_on_path(self, points, window=None):
+        """
+        Vectorized distance-to-path lookup.
+
+        Args:
+            points: (N, 2+) array of x, y (extra columns such as z are ignored)
+            window: number of segments checked on each side of the grid candidate
+                (None = the window chosen for this path's vertex spacing)
+
+        Returns:
+            (distance, progress) arrays: distance to the path in pixels and the
+            arc-length position of the nearest path point as a fraction (0..1).
+        """
+        index = self._distance_index
+        pts, seg, arc = index["pts"], index["seg"], index["arc"]
+        q = np.asarray(points, dtype=np.float64).reshape(-1, np.shape(points)[-1])[:, :2]
+        if window is None:
+            window = int(index.get("window", 4))
+
+        cells = np.floor((q - index["origin"]) / index["cell"]).astype(int)
+        grid = index["grid"]
+        inside = np.all((cells >= 0) & (cells < grid.shape), axis=1)
+        candidate = np.empty(len(q), dtype=np.int64)
+        candidate[inside] = grid[cells[inside, 0], cells[inside, 1]]
+        if not inside.all():
+            # outside the grid: exact nearest vertex by brute force (rare)
+            far = q[~inside]
+            candidate[~inside] = ((far[:, None, :] - pts[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+
+        # refine against the segments around the candidate vertex
+        seg_idx = np.clip(candidate[:, None] + np.arange(-window, window)[None, :], 0, len(seg) - 1)
+        a = pts[seg_idx]
+        ab = seg[seg_idx]
+        t = np.clip((((q[:, None, :] - a) * ab).sum(axis=2)) / index["seg_len2"][seg_idx], 0.0, 1.0)
+        closest = a + ab * t[..., None]
+        d2 = ((q[:, None, :] - closest) ** 2).sum(axis=2)
+        best = d2.argmin(axis=1)
+        rows = np.arange(len(q))
+        best_seg = seg_idx[rows, best]
+        distance = np.sqrt(d2[rows, best])
+        if arc[-1] <= 0:
+            # degenerate spiral (e.g. outer_radius 0): every point is at the start
+            return distance, np.zeros(len(q))
+        progress = (arc[best_seg] + t[rows, best] * (arc[best_seg + 1] - arc[best_seg])) / arc[-1]
+        return distance, progress
 
+    def distance_to_path(self, point):
+        """Return (distance in pixels, arc-length progress 0..1) of the nearest path point."""
+        distance, progress = self.nearest_on_path([point[:2]])
+        return float(distance[0]), float(progress[0])
 
     def get_reference_dot(self, progress):
         """Get the position of the reference dot along the spiral path."""
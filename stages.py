@@ -0,0 +1,380 @@
+"""
+Declarative game protocol: one Stage object per entry of config.yaml `instructions`.
+
+Each stage is built once, precomputes what it draws (spiral, start/end
+circles, instruction text) and implements the hooks GameLoop dispatches to:
+
+    enter(game, now)                 the stage becomes active
+    tick(game, finger_pos, now)      one fixed simulation step; True when done
+    sample(game, finger_pos, raw_pos, now)   per-frame input handling
+    render(game, frame)              per-frame drawing
+    exit(game, now)                  the next stage takes over
+
+A protocol is a list of entries such as
+
+    - type: trace
+      text: "Start at the blue circle and trace"
+      spiral: main          # name from GameLoop.spirals
+      direction: forward    # forward (centre -> out) | reverse (out -> centre)
+
+Stage types: message, free_trace, depth_feedback, demo_dot, countdown, trace.
+"""
+import cv2
+
+from game_state import GameState
+
+YELLOW = (0, 255, 255)
+GREEN = (0, 255, 0)
+ENTRY_RADIUS = 30  # start circle of a forward trace, as Spiral.check_entry
+
+DEPTH_STATUS = {"green": "Good depth", "red": "Move further", "blue": "Move closer"}
+
+# the protocol the game shipped with; used when config.yaml has no typed instructions
+DEFAULT_PROTOCOL = [
+    {"type": "free_trace", "text": "Move your finger and see its trace", "duration": 5},
+    {"type": "depth_feedback", "text": "Observe the depth feedback", "duration": 5},
+    {"type": "demo_dot", "text": "Watch the reference dot move", "duration": 5, "spiral": "main"},
+    {"type": "countdown", "text": "Get ready to trace the spiral", "duration": 3},
+    {"type": "trace", "text": "Start at the blue circle and trace", "spiral": "main", "direction": "forward"},
+    {"type": "countdown", "text": "Get ready to trace the spiral", "duration": 3},
+    {"type": "trace", "text": "Follow the blue dot", "spiral": "small", "direction": "reverse"},
+]
+
+
+def print_deviation(label, summary):
+    print(f"{label}: deviation mean {summary['mean']:.1f}px, rms {summary['rms']:.1f}px, "
+          f"max {summary['max']:.1f}px over {summary['samples']} samples")
+
+
+def print_tremor(label, result):
+    if result is None:
+        print(f"{label}: not enough samples for a tremor estimate")
+        return
+    print(f"{label}: tremor {result['frequency']:.1f} Hz, amplitude {result['amplitude']:.1f}px, "
+          f"band power {result['band_power']:.2f}px^2")
+
+
+class Stage:
+    depth_feedback = False  # compute depth colour/status from the fingertip z
+
+    def __init__(self, spiral=None, spiral_name=None, text=None, duration=0):
+        """
+        Args:
+            spiral: Spiral shown during the stage (None = no spiral)
+            spiral_name: key of the spiral in GameLoop.spirals
+            text: instruction text shown top-centre
+            duration: seconds until the stage ends on its own (0 = never)
+        """
+        self.spiral = spiral
+        self.spiral_name = spiral_name
+        self.text = text
+        self.duration = duration
+        self.start_time = 0.0
+        self.circles = ()
+
+    @property
+    def title(self):
+        return self.text or type(self).__name__
+
+    def enter(self, game, now):
+        self.start_time = now
+        game.reference_dot_pos = None
+
+    def exit(self, game, now):
+        pass
+
+    def tick(self, game, finger_pos, now):
+        return self.duration > 0 and now - self.start_time >= self.duration
+
+    def sample(self, game, finger_pos, raw_pos, now):
+        game.spiral_color = None
+        game.depth_status = None
+        if self.depth_feedback:
+            game.depth_status = "N/A"
+            if finger_pos is not None:
+                game.spiral_color = self.spiral.check_depth(finger_pos[2], tolerance=game.depth_tolerance)
+                game.depth_status = DEPTH_STATUS.get(game.spiral_color, "Adjust depth")
+
+    def draws_trace(self, game):
+        return False
+
+    def render(self, game, frame):
+        renderer = game.renderer
+        if game.depth_status is not None:
+            status = game.depth_status
+            cv2.putText(frame, status, (10, frame.shape[0] - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.7,
+                        (0, 255, 0) if status == "Good depth" else (0, 0, 255)
+                        if "further" in status else (200, 200, 200), 2)
+        renderer.set_scene(frame, self.spiral, finger_depth_color=game.spiral_color,
+                           text=self.text, circles=self.scene_circles(game))
+        if self.draws_trace(game):
+            renderer.update_trace(game.trace_manager.get_trace(), game.trace_manager.generation)
+        else:
+            renderer.update_trace(None)
+        renderer.compose(frame)
+        self.draw_hud(game, frame)
+        if game.reference_dot_pos is not None:
+            renderer.draw_reference_dot(frame, game.reference_dot_pos)
+
+    def scene_circles(self, game):
+        return self.circles
+
+    def draw_hud(self, game, frame):
+        """Live readouts drawn over the composed layers, under the reference dot."""
+
+
+class MessageStage(Stage):
+    """Instruction text only, for `duration` seconds."""
+
+
+class FreeTraceStage(Stage):
+    """The fingertip leaves a trace, no scoring."""
+
+    def sample(self, game, finger_pos, raw_pos, now):
+        super().sample(game, finger_pos, raw_pos, now)
+        # unscored, so frames without a measurement (optical flow) are drawn too
+        position = raw_pos if raw_pos is not None else finger_pos
+        if position is not None:
+            game.trace_manager.update_trace(position, t=now, display_pos=finger_pos)
+
+    def draws_trace(self, game):
+        return True
+
+    def exit(self, game, now):
+        game.trace_manager.clear_trace()
+
+
+class DepthFeedbackStage(Stage):
+    """The spiral colour shows whether the hand is at the right distance."""
+    depth_feedback = True
+
+
+class DemoDotStage(DepthFeedbackStage):
+    """The reference dot runs along the spiral at the tracing speed."""
+
+    def tick(self, game, finger_pos, now):
+        progress = min((now - self.start_time) * game.speed_multiplier / len(self.spiral.path_points), 1.0)
+        game.reference_dot_pos = self.spiral.get_reference_dot(progress)
+        return super().tick(game, finger_pos, now)
+
+
+class TraceStage(Stage):
+    """Scored tracing of a spiral behind the reference dot, forward or in reverse."""
+    depth_feedback = True
+
+    def __init__(self, spiral, spiral_name, text=None, reverse=False, end_circle_radius=30, label=None):
+        """
+        Args:
+            reverse: start at the outer end and finish at the centre
+            end_circle_radius: radius of the end circle (and of the start circle in reverse)
+            label: name used for printed and logged scores (defaults to the spiral name)
+        """
+        super().__init__(spiral, spiral_name, text)
+        self.reverse = reverse
+        self.label = label or spiral_name
+        self.end_circle_radius = int(end_circle_radius)
+        path = spiral.path_points
+        if reverse:
+            self.start_point, self.end_point = path[-1], path[0]
+            self.start_circle = ((path[-1], self.end_circle_radius, YELLOW),)
+            self.end_circle = ((path[0], self.end_circle_radius, GREEN),)
+        else:
+            self.start_point, self.end_point = path[0], path[-1]
+            self.start_circle = ((spiral.center, spiral.inner_radius, YELLOW),)
+            self.end_circle = ((path[-1], self.end_circle_radius, YELLOW),)
+        self.start_radius = self.end_circle_radius if reverse else ENTRY_RADIUS
+        self.started = False
+        self.progress = 0.0
+        self.trace_start_time = None
+
+    @property
+    def title(self):
+        return self.text or f"Trace {self.label}"
+
+    def enter(self, game, now):
+        super().enter(game, now)
+        self.started = False
+        self.progress = 0.0
+        game.reference_dot_pos = self.start_point
+
+    def exit(self, game, now):
+        game.trace_manager.clear_trace()
+
+    @staticmethod
+    def _within(x, y, point, radius):
+        dx = x - point[0]
+        dy = y - point[1]
+        return (dx * dx + dy * dy) ** 0.5 <= radius
+
+    # The completion rules below use plain arithmetic, so x, y, z may also be
+    # numpy arrays: synthetic_traces applies them to whole traces at once.
+    # NaN (undetected) samples never satisfy them.
+
+    def can_start(self, x, y, z, depth_tolerance=0.05):
+        """Start rule: the fingertip is inside the start circle at green depth."""
+        return self._within(x, y, self.start_point, self.start_radius) & (abs(z - 0.5) < depth_tolerance)
+
+    def can_finish(self, x, y):
+        """End rule, checked once the reference dot has arrived: the fingertip is inside the end circle."""
+        return self._within(x, y, self.end_point, self.end_circle_radius)
+
+    def dot_seconds(self, speed_multiplier):
+        """Seconds the reference dot takes from the start to the end of the path."""
+        return len(self.spiral.path_points) / speed_multiplier
+
+    def tick(self, game, finger_pos, now):
+        game_state = game.game_state
+        if not self.started and finger_pos is not None:
+            if self.can_start(*finger_pos[:3], depth_tolerance=game.depth_tolerance):
+                self.started = True
+                self.trace_start_time = now
+                game_state.state = GameState.TRACING
+                game_state.reset_deviation()
+                game.trace_manager.start_trace()
+                game.tremor.reset()
+
+        if self.started and game_state.state != GameState.FINISHED:
+            elapsed = now - self.trace_start_time
+            self.progress = min(elapsed / self.dot_seconds(game.speed_multiplier), 1.0)
+            game.reference_dot_pos = self.spiral.get_reference_dot(
+                1.0 - self.progress if self.reverse else self.progress)
+        elif not self.started:
+            self.progress = 0.0
+            game.reference_dot_pos = self.start_point
+
+        if not (self.started and self.progress >= 1.0 and finger_pos is not None
+                and game_state.state != GameState.FINISHED):
+            return False
+        if not self.can_finish(finger_pos[0], finger_pos[1]):
+            return False
+
+        game_state.state = GameState.FINISHED
+        if game.verbose:
+            label = f"{self.label.capitalize()} spiral"
+            print_deviation(label, game_state.deviation_summary())
+            print_tremor(label, game.tremor.result())
+        return True
+
+    def sample(self, game, finger_pos, raw_pos, now):
+        super().sample(game, finger_pos, raw_pos, now)
+        # scoring uses the raw measurement; the filtered position is only drawn
+        if self.started and game.game_state.state == GameState.TRACING and raw_pos is not None:
+            game.trace_manager.update_trace(raw_pos, t=now, display_pos=finger_pos)
+            game.game_state.update_deviation(raw_pos, self.spiral)
+            game.tremor.add_sample(now, raw_pos[0], raw_pos[1])
+
+    def draws_trace(self, game):
+        return self.started
+
+    def scene_circles(self, game):
+        if not self.started:
+            return self.start_circle
+        if self.progress >= 1.0 and game.game_state.state != GameState.FINISHED:
+            return self.end_circle
+        return ()
+
+    def draw_hud(self, game, frame):
+        if game.game_state.state == GameState.TRACING:
+            result = game.tremor.result()
+            if result is not None:
+                cv2.putText(frame, f"Tremor {result['frequency']:.1f} Hz  {result['amplitude']:.1f}px",
+                            (frame.shape[1] - 300, frame.shape[0] - 20),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (200, 200, 200), 2)
+
+
+class CountdownStage(Stage):
+    """Seconds counting down before a trace stage, showing where that trace starts."""
+
+    def __init__(self, target, title=None, duration=3):
+        """
+        Args:
+            target: the TraceStage that follows
+            title: name of the stage (the instruction text is not drawn during a countdown)
+        """
+        super().__init__(target.spiral, target.spiral_name, None, duration)
+        self.target = target
+        self.circles = target.start_circle
+        self._title = title
+        self.remaining = duration
+
+    @property
+    def title(self):
+        return self._title or "Countdown"
+
+    def enter(self, game, now):
+        super().enter(game, now)
+        self.remaining = self.duration
+        game.reference_dot_pos = self.target.start_point
+
+    def tick(self, game, finger_pos, now):
+        self.remaining = max(0, self.duration - int(now - self.start_time))
+        return self.remaining == 0
+
+    def exit(self, game, now):
+        game.trace_manager.clear_trace()
+
+    def render(self, game, frame):
+        if self.remaining > 0:
+            text = str(self.remaining)
+            text_size = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 2, 4)[0]
+            cv2.putText(frame, text, (frame.shape[1] - text_size[0] - 20, 60),
+                        cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 0, 255), 4)
+        super().render(game, frame)
+
+
+STAGE_TYPES = {
+    "message": MessageStage,
+    "free_trace": FreeTraceStage,
+    "depth_feedback": DepthFeedbackStage,
+    "demo_dot": DemoDotStage,
+    "trace": TraceStage,
+}
+
+
+def build_stages(instructions, spirals, end_circle_radius=30):
+    """
+    Build the stage objects of a protocol.
+
+    Args:
+        instructions: list of dicts with 'type', 'text', 'duration', 'spiral',
+            'direction' and 'label'; None or an untyped list (the old
+            text/duration format) selects DEFAULT_PROTOCOL
+        spirals: dict name -> Spiral
+        end_circle_radius: end circle radius of trace stages
+
+    Returns:
+        list of Stage
+    """
+    if not instructions or any("type" not in entry for entry in instructions):
+        instructions = DEFAULT_PROTOCOL
+
+    stages = [None] * len(instructions)
+    # built back to front so a countdown can point at the trace stage after it
+    for i in reversed(range(len(instructions))):
+        entry = instructions[i]
+        kind = entry["type"]
+        text = entry.get("text") or None
+        name = entry.get("spiral", "main")
+        if kind == "countdown":
+            target = stages[i + 1] if i + 1 < len(stages) else None
+            if not isinstance(target, TraceStage):
+                raise ValueError(f"instructions[{i}]: a countdown must be followed by a trace stage")
+            stages[i] = CountdownStage(target, title=text, duration=entry.get("duration", 3))
+            continue
+        if kind not in STAGE_TYPES:
+            raise ValueError(f"instructions[{i}]: unknown stage type '{kind}', "
+                             f"expected one of {sorted(STAGE_TYPES) + ['countdown']}")
+        if name not in spirals:
+            raise ValueError(f"instructions[{i}]: unknown spiral '{name}', expected one of {sorted(spirals)}")
+        if kind == "trace":
+            stages[i] = TraceStage(spirals[name], name, text, reverse=entry.get("direction") == "reverse",
+                                   end_circle_radius=end_circle_radius, label=entry.get("label"))
+        else:
+            stages[i] = STAGE_TYPES[kind](spirals[name], name, text, entry.get("duration", 0))
+
+    # labels identify tracings in logs and scores, so they must be unique
+    labels = [stage.label for stage in stages if isinstance(stage, TraceStage)]
+    for stage in stages:
+        if isinstance(stage, TraceStage) and labels.count(stage.label) > 1:
+            stage.label = f"{stage.label}_{stages.index(stage)}"
+    return stages
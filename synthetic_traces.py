@@ -0,0 +1,317 @@
+"""
+Synthetic fingertip traces and a parallel parameter sweep of the game's scoring.
+
+generate_trace() plays a patient tracing a Spiral: lead-in at the start
+circle, arc-length motion along the path with speed fluctuation, tremor with
+frequency jitter and amplitude modulation, slow positional drift, depth
+wobble, camera frame-time jitter and detection dropouts (NaN samples).
+
+The sweep runs every configuration of a parameter grid on a process pool.
+Each configuration generates many traces, applies the completion rules of
+the game's own stages.TraceStage to whole traces (see simulate_completion)
+and scores the completed part with batch_scoring. Every configuration uses
+the same seeds (common random numbers), so differences between
+configurations come from the parameters rather than from different random
+draws. Results are summarized per configuration and as a per-parameter
+sensitivity table.
+
+Usage:
+    python synthetic_traces.py --trials 200 --output sweep.csv
+    python synthetic_traces.py --speed-multiplier 8 16 32 --end-circle-radius 20 30 \
+        --tremor-hz 4 6 9 --tremor-px 1 3 6
+"""
+import argparse
+import csv
+import itertools
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from batch_scoring import score_traces
+from spiral import Spiral
+from stages import TraceStage
+
+
+def generate_trace(spiral, draw_seconds=30.0, fps=30.0, fps_jitter=0.1, tremor_hz=0.0, tremor_px=0.0,
+                   drift_px=0.0, depth_wobble=0.0, dropout_rate=0.0, dropout_frames=5.0,
+                   speed_variation=0.2, lead_in=1.0, dwell=2.0, reverse=False, rng=None):
+    """
+    One synthetic tracing of a spiral.
+
+    Args:
+        spiral: Spiral to follow
+        draw_seconds: time the patient takes from start to end of the path
+        fps, fps_jitter: camera frame rate and relative frame-interval jitter
+        tremor_hz, tremor_px: tremor frequency and per-axis amplitude
+        drift_px: RMS of the slow positional drift away from the path
+        depth_wobble: amplitude of the z oscillation around the 0.5 target
+        dropout_rate: probability per frame that a detection dropout starts
+        dropout_frames: mean dropout length in frames
+        speed_variation: relative fluctuation of the drawing speed
+        lead_in: seconds holding the start position before drawing
+        dwell: seconds holding the end position after drawing
+        reverse: trace from the outer end to the centre (small-spiral step)
+        rng: numpy Generator (a fresh one if None)
+
+    Returns:
+        (N, 4) float64 array of t, x, y, z; undetected samples are NaN in x, y, z
+    """
+    rng = rng or np.random.default_rng()
+    # one independent stream per noise source, so a parameter that switches
+    # one source on or off leaves the draws of the others unchanged
+    timing, motion, tremor, drift, depth, dropout = (
+        np.random.default_rng(s) for s in rng.integers(2**63, size=6))
+    total = lead_in + draw_seconds + dwell
+    count = int(total * fps * 1.2) + 2
+    dt = np.maximum(1.0 / fps * (1.0 + fps_jitter * timing.standard_normal(count)), 0.2 / fps)
+    t = np.concatenate(([0.0], np.cumsum(dt)))
+    t = t[t <= total]
+    n = len(t)
+
+    # arc-length position: monotonic with a slowly fluctuating speed
+    drawing = np.clip((t - lead_in) / draw_seconds, 0.0, 1.0)
+    wobble = np.cumsum(motion.standard_normal(n)) / np.sqrt(max(n, 1))
+    wobble = np.convolve(wobble, np.ones(15) / 15, mode="same")
+    progress = np.clip(drawing + speed_variation * wobble * drawing * (1.0 - drawing), 0.0, 1.0)
+    progress = np.maximum.accumulate(progress)
+    if reverse:
+        progress = 1.0 - progress
+
+    path = spiral.path_array.astype(np.float64)
+    index = progress * (len(path) - 1)
+    x = np.interp(index, np.arange(len(path)), path[:, 0])
+    y = np.interp(index, np.arange(len(path)), path[:, 1])
+
+    if tremor_px:
+        # instantaneous frequency wanders by a few percent; amplitude breathes slowly
+        freq = tremor_hz * (1.0 + 0.03 * np.convolve(tremor.standard_normal(n), np.ones(31) / 31, mode="same"))
+        phase = 2.0 * np.pi * np.cumsum(np.diff(t, prepend=0.0) * freq)
+        envelope = tremor_px * (1.0 + 0.2 * np.sin(2.0 * np.pi * 0.2 * t + tremor.uniform(0, 2 * np.pi)))
+        x += envelope * np.sin(phase + tremor.uniform(0, 2 * np.pi))
+        y += envelope * np.sin(phase + tremor.uniform(0, 2 * np.pi))
+    if drift_px:
+        for axis in (x, y):
+            walk = np.convolve(np.cumsum(drift.standard_normal(n)), np.ones(61) / 61, mode="same")
+            walk -= walk.mean()
+            axis += drift_px * walk / max(walk.std(), 1e-9)
+
+    z = 0.5 + depth_wobble * np.sin(2.0 * np.pi * 0.3 * t + depth.uniform(0, 2 * np.pi))
+    z += 0.005 * depth.standard_normal(n)
+
+    # pixel quantization as in FingerTracker, then detection dropouts
+    trace = np.column_stack((t, np.floor(x), np.floor(y), z))
+    if dropout_rate:
+        starts = np.flatnonzero(dropout.random(n) < dropout_rate)
+        lengths = dropout.geometric(1.0 / max(dropout_frames, 1.0), len(starts))
+        lost = np.zeros(n + 1, dtype=np.int64)
+        np.add.at(lost, starts, 1)
+        np.add.at(lost, np.minimum(starts + lengths, n), -1)
+        trace[np.cumsum(lost[:n]) > 0, 1:] = np.nan
+    return trace
+
+
+def simulate_completion(trace, stage, speed_multiplier=16.0, depth_tolerance=0.05):
+    """
+    Run a whole trace through the completion rules of a stages.TraceStage.
+
+    The trace starts at the first sample TraceStage.can_start accepts; the
+    reference dot then needs TraceStage.dot_seconds, and the step completes
+    at the first later sample TraceStage.can_finish accepts once the dot has
+    arrived. The rules are evaluated on every sample rather than on the
+    game's fixed ticks.
+
+    Args:
+        trace: (N, 4) array of t, x, y, z as generate_trace returns
+        stage: TraceStage of the tracing step
+        speed_multiplier, depth_tolerance: the game settings of the same name
+
+    Returns:
+        (start index, end index) of the scored part, or None if the step never completes
+    """
+    t, x, y, z = trace.T
+    with np.errstate(invalid="ignore"):
+        started = np.flatnonzero(stage.can_start(x, y, z, depth_tolerance))
+        if not len(started):
+            return None
+        start = started[0]
+        dot_done = t >= t[start] + stage.dot_seconds(speed_multiplier)
+        done = np.flatnonzero(dot_done & stage.can_finish(x, y) & (np.arange(len(t)) > start))
+    if not len(done):
+        return None
+    return start, done[0]
+
+
+def _nanmean(values):
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    return float(values.mean()) if len(values) else float("nan")
+
+
+def run_configuration(params, trials=100, seed=0, sample_rate=60.0, band=(3.0, 12.0)):
+    """
+    Generate, complete and score `trials` traces for one parameter set.
+
+    Args:
+        params: dict with speed_multiplier, end_circle_radius, outer_radius,
+            depth_tolerance, draw_seconds, tremor_hz, tremor_px, drift_px,
+            depth_wobble, dropout_rate
+        trials: traces per configuration
+        seed: trial i uses the seed (seed, i), so configurations run with
+            the same seed see the same random draws
+
+    Returns:
+        dict of params plus completion rate and score statistics
+    """
+    spiral = Spiral(center=(320, 240), outer_radius=params["outer_radius"], turns=2)
+    stage = TraceStage(spiral, "main", end_circle_radius=params["end_circle_radius"])
+    # a patient who arrives before the reference dot waits in the end circle for it
+    dot_seconds = stage.dot_seconds(params["speed_multiplier"])
+    dwell = max(2.0, dot_seconds - params["draw_seconds"] + 2.0)
+    completed, completion_time, scored = [], [], []
+    samples = 0
+    for trial in range(trials):
+        rng = np.random.default_rng([seed, trial])
+        trace = generate_trace(spiral, draw_seconds=params["draw_seconds"], tremor_hz=params["tremor_hz"],
+                               tremor_px=params["tremor_px"], drift_px=params["drift_px"],
+                               depth_wobble=params["depth_wobble"], dropout_rate=params["dropout_rate"],
+                               dwell=dwell, rng=rng)
+        samples += len(trace)
+        span = simulate_completion(trace, stage, params["speed_multiplier"], params["depth_tolerance"])
+        completed.append(span is not None)
+        if span is None:
+            continue
+        start, end = span
+        completion_time.append(trace[end, 0] - trace[start, 0])
+        part = trace[start:end + 1]
+        scored.append(part[~np.isnan(part[:, 1]), :3])
+
+    summary = dict(params)
+    summary["trials"] = trials
+    summary["samples"] = samples
+    summary["completion_rate"] = float(np.mean(completed))
+    summary["completion_time"] = float(np.mean(completion_time)) if completion_time else float("nan")
+    nan = float("nan")
+    if scored:
+        scores = score_traces(scored, spiral, sample_rate, band)
+        frequency = scores["tremor_frequency"]
+        summary["deviation_mean"] = _nanmean(scores["deviation_mean"])
+        summary["path_length_ratio"] = _nanmean(scores["path_length_ratio"])
+        summary["tremor_amplitude"] = _nanmean(scores["tremor_amplitude"])
+        summary["tremor_frequency_error"] = (_nanmean(np.abs(frequency - params["tremor_hz"]))
+                                             if params["tremor_px"] else nan)
+    else:
+        summary.update(deviation_mean=nan, path_length_ratio=nan, tremor_amplitude=nan,
+                       tremor_frequency_error=nan)
+    return summary
+
+
+def sweep(grid, trials=100, workers=None, seed=0, sample_rate=60.0, band=(3.0, 12.0)):
+    """
+    Run run_configuration() for every combination of the grid on a process pool.
+
+    Every configuration gets the same seed (common random numbers).
+    """
+    names = list(grid)
+    configurations = [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+    if workers == 0:
+        return [run_configuration(params, trials, seed, sample_rate, band) for params in configurations]
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn")) as pool:
+        futures = [pool.submit(run_configuration, params, trials, seed, sample_rate, band)
+                   for params in configurations]
+        return [future.result() for future in futures]
+
+
+SWEEP_METRICS = ["completion_rate", "completion_time", "deviation_mean", "tremor_frequency_error"]
+
+
+def sensitivity(results, grid):
+    """
+    Per swept parameter: the mean of each metric at every value of that parameter.
+
+    Returns:
+        dict parameter -> list of (value, {metric: mean}) and the metric spread
+    """
+    table = {}
+    for name, values in grid.items():
+        if len(values) < 2:
+            continue
+        rows = []
+        for value in values:
+            subset = [r for r in results if r[name] == value]
+            rows.append((value, {m: _nanmean([r[m] for r in subset]) for m in SWEEP_METRICS}))
+        spread = {}
+        for m in SWEEP_METRICS:
+            means = np.array([row[1][m] for row in rows])
+            means = means[~np.isnan(means)]
+            spread[m] = float(means.max() - means.min()) if len(means) else float("nan")
+        table[name] = (rows, spread)
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic tremor trace parameter sweep")
+    parser.add_argument("--speed-multiplier", type=float, nargs="+")
+    parser.add_argument("--end-circle-radius", type=float, nargs="+")
+    parser.add_argument("--outer-radius", type=float, nargs="+")
+    parser.add_argument("--depth-tolerance", type=float, nargs="+")
+    parser.add_argument("--draw-seconds", type=float, nargs="+", default=[20.0, 35.0])
+    parser.add_argument("--tremor-hz", type=float, nargs="+", default=[4.0, 6.0, 9.0])
+    parser.add_argument("--tremor-px", type=float, nargs="+", default=[0.0, 2.0, 6.0])
+    parser.add_argument("--drift-px", type=float, nargs="+", default=[3.0])
+    parser.add_argument("--depth-wobble", type=float, nargs="+", default=[0.03])
+    parser.add_argument("--dropout-rate", type=float, nargs="+", default=[0.01])
+    parser.add_argument("--trials", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=None, help="pool size, 0 = no pool")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write one row per configuration to this .csv")
+    args = parser.parse_args()
+
+    config = {}
+    if os.path.exists("config.yaml"):
+        from config_loader import load_config
+        config = load_config("config.yaml")
+    game_cfg, spiral_cfg, tremor_cfg = (config.get(k, {}) for k in ("game", "spiral", "tremor"))
+    grid = {
+        "speed_multiplier": args.speed_multiplier or [game_cfg.get("speed_multiplier", 16.0)],
+        "end_circle_radius": args.end_circle_radius or [game_cfg.get("end_circle_radius", 30)],
+        "outer_radius": args.outer_radius or [spiral_cfg.get("outer_radius", 200)],
+        "depth_tolerance": args.depth_tolerance or [game_cfg.get("depth_tolerance", 0.05)],
+        "draw_seconds": args.draw_seconds,
+        "tremor_hz": args.tremor_hz,
+        "tremor_px": args.tremor_px,
+        "drift_px": args.drift_px,
+        "depth_wobble": args.depth_wobble,
+        "dropout_rate": args.dropout_rate,
+    }
+
+    start = time.perf_counter()
+    results = sweep(grid, trials=args.trials, workers=args.workers, seed=args.seed,
+                    sample_rate=tremor_cfg.get("sample_rate", 60.0),
+                    band=tuple(tremor_cfg.get("band", (3.0, 12.0))))
+    elapsed = time.perf_counter() - start
+    samples = sum(r["samples"] for r in results)
+    print(f"{len(results)} configurations x {args.trials} trials, {samples} samples "
+          f"in {elapsed:.1f}s ({samples / elapsed:,.0f} samples/s)")
+
+    for name, (rows, spread) in sensitivity(results, grid).items():
+        print(f"\n{name}:")
+        for value, means in rows:
+            print(f"  {value:>8g}  completion {means['completion_rate']:5.1%}  "
+                  f"time {means['completion_time']:6.1f}s  deviation {means['deviation_mean']:5.1f}px  "
+                  f"freq error {means['tremor_frequency_error']:6.3f} Hz")
+        print(f"  spread    completion {spread['completion_rate']:5.1%}  "
+              f"deviation {spread['deviation_mean']:5.1f}px")
+
+    if args.output:
+        with open(args.output, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+        print(f"\nSaved {len(results)} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Keyframe-mode tests; MediaPipe is not needed (detection and flow are replaced per test)."""
+import numpy as np
+
+from finger_tracker import FingerTracker
+
+TIP = (320, 240, 0.5)
+
+
+def keyframe_tracker(flow_ok, **kwargs):
+    """
+    Keyframe tracker whose detection always finds TIP and whose optical flow
+    succeeds or fails as flow_ok() says. Detection is priced at 100 ms and
+    flow at 1 ms, so the frame budget alone would pick the maximum interval.
+    """
+    tracker = FingerTracker(keyframe=True, frame_budget_ms=15, max_keyframe_interval=8, **kwargs)
+    tracker._ready.set()
+    tracker._measure = lambda frame: TIP
+    tracker._track_flow = lambda gray: tracker._flow_tip if flow_ok() else None
+    tracker._detect_cost, tracker._flow_cost = 0.1, 0.001
+    tracker._ema = lambda previous, value, weight=0.2: previous  # keep the costs fixed
+    return tracker
+
+
+def run(tracker, frames):
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    for _ in range(frames):
+        tracker.update(frame)
+
+
+def test_budget_alone_uses_the_longest_interval():
+    tracker = keyframe_tracker(flow_ok=lambda: True)
+    run(tracker, 20)
+    assert tracker.keyframe_interval == 8
+
+
+def test_flow_failure_shrinks_the_interval_and_it_stays_shrunk():
+    tracker = keyframe_tracker(flow_ok=lambda: True)
+    run(tracker, 20)
+    assert tracker.keyframe_interval == 8
+
+    ok = iter([False] + [True] * 1000)
+    tracker._track_flow = lambda gray: tracker._flow_tip if next(ok) else None
+    run(tracker, 1)  # flow fails: immediate keyframe
+    assert tracker.keyframe_interval == 4
+    # the following keyframes re-fit the budget but stay under the lowered cap
+    run(tracker, 6)
+    assert tracker.keyframe_interval == 4
+    assert tracker.keyframe_interval_cap == 4
+
+
+def test_repeated_flow_failures_fall_back_to_detecting_every_frame():
+    tracker = keyframe_tracker(flow_ok=lambda: False)
+    run(tracker, 20)
+    assert tracker.keyframe_interval == 1
+    assert tracker.tracked_frames == 0
+
+
+def test_cap_relaxes_after_a_run_of_good_flow_frames():
+    tracker = keyframe_tracker(flow_ok=lambda: True)
+    tracker.keyframe_interval_cap = 2
+    run(tracker, 200)
+    assert tracker.keyframe_interval_cap == 8
+    assert tracker.keyframe_interval == 8
+
+
+def test_flow_frames_are_not_measurements():
+    tracker = keyframe_tracker(flow_ok=lambda: True)
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    position = tracker.update(frame)
+    assert tracker.measured and tracker.raw_position == TIP
+    position = tracker.update(frame)
+    assert position is not None
+    assert not tracker.measured and tracker.raw_position is None
+
+
+def test_reset_starts_like_a_fresh_tracker():
+    tracker = keyframe_tracker(flow_ok=lambda: True)
+    tracker.keyframe_interval_cap = 2
+    run(tracker, 5)
+    tracker.reset()
+    assert tracker.keyframe_interval == 1
+    assert tracker.keyframe_interval_cap == 8
+    assert tracker._flow_tip is None
+    # the first frame after a reset is a MediaPipe measurement, never optical flow
+    run(tracker, 1)
+    assert tracker.measured and tracker.raw_position == TIP
+
+
+def test_landmark_history_keeps_only_measured_frames():
+    tracker = keyframe_tracker(flow_ok=lambda: True, landmark_history=4)
+
+    def measure(frame):
+        tracker.hand_landmarks[:] = 1.0
+        tracker.hand_score = 0.9
+        return TIP
+
+    tracker._measure = measure
+    run(tracker, 2)  # a keyframe, then an optical-flow frame
+    _, landmarks, score = tracker.landmark_ring.window()
+    assert np.all(landmarks[0] == 1.0) and score[0] == np.float32(0.9)
+    assert np.all(np.isnan(landmarks[1])) and score[1] == 0.0
@@ -1,16 +1,98 @@
+import time
+
+import numpy as np
+
+
 class TraceManager:
-    def __init__(self):
-        self.trace_points = []
+    COLUMNS = ("t", "x", "y", "z")
+
+    def __init__(self, initial_capacity=1024, max_points=None, min_display_distance=0.0):
+        """
+        Fingertip trace stored in preallocated NumPy arrays.
+
+        Args:
+            initial_capacity: rows allocated up front (doubles when full)
+            max_points: upper bound on stored samples; the oldest quarter is
+                dropped when it is reached (None = unbounded)
+            min_display_distance: distance gate in pixels for the display
+                polyline; full-resolution samples are always kept
+        """
+        self.max_points = max_points
+        self.min_display_distance = min_display_distance
+        capacity = initial_capacity if max_points is None else min(initial_capacity, max_points)
+        self._samples = np.empty((max(capacity, 2), 4), dtype=np.float64)  # t, x, y, z
+        self._display = np.empty((max(capacity, 2), 2), dtype=np.int32)
+        self._size = 0
+        self._display_size = 0
+        self.generation = 0  # bumped whenever the trace is cleared or compacted
+
+    @classmethod
+    def from_config(cls, trace_cfg):
+        return cls(
+            max_points=trace_cfg.get("max_points"),
+            min_display_distance=trace_cfg.get("min_display_distance", 0.0),
+        )
 
     def start_trace(self):
-        self.trace_points = []
+        self.clear_trace()
+
+    def _make_room(self, array, size):
+        """Return an array with space for one more row (amortized growth / bounded drop)."""
+        if size < len(array):
+            return array, size
+        if self.max_points is None or len(array) < self.max_points:
+            new_len = len(array) * 2
+            if self.max_points is not None:
+                new_len = min(new_len, self.max_points)
+            grown = np.empty((new_len, array.shape[1]), dtype=array.dtype)
+            grown[:size] = array[:size]
+            return grown, size
+        # at the bound: drop the oldest quarter in place
+        drop = max(size // 4, 1)
+        array[:size - drop] = array[drop:size]
+        self.generation += 1
+        return array, size - drop
 
-    def update_trace(self, finger_pos):
-        if finger_pos:
-            self.trace_points.append(finger_pos)
+    def update_trace(self, finger_pos, t=None, display_pos=None):
+        """
+        Append one sample.
+
+        Args:
+            finger_pos: measured (x, y, z), stored at full resolution for scoring
+            t: sample time (defaults to time.monotonic())
+            display_pos: position to draw instead (e.g. filtered/predicted), if any
+        """
+        if finger_pos is None:
+            return
+        if t is None:
+            t = time.monotonic()
+        z = finger_pos[2] if len(finger_pos) > 2 else np.nan
+        self._samples, self._size = self._make_room(self._samples, self._size)
+        self._samples[self._size] = (t, finger_pos[0], finger_pos[1], z)
+        self._size += 1
+
+        x, y = (display_pos if display_pos is not None else finger_pos)[:2]
+
+        if self._display_size:
+            last_x, last_y = self._display[self._display_size - 1]
+            if (x - last_x) ** 2 + (y - last_y) ** 2 < self.min_display_distance ** 2:
+                return
+        self._display, self._display_size = self._make_room(self._display, self._display_size)
+        self._display[self._display_size] = (x, y)
+        self._display_size += 1
 
     def get_trace(self):
-        return self.trace_points
-    
+        """Zero-copy (N, 2) int32 view of the (distance-gated) display polyline."""
+        return self._display[:self._display_size]
+
+    def get_samples(self):
+        """Zero-copy (N, 4) view of the full-resolution t, x, y, z samples."""
+        return self._samples[:self._size]
+
+    def __len__(self):
+        return self._size
+
     def clear_trace(self):
-        self.trace_points = []
+        self._size = 0
+        self._display_size = 0
+        self.generation += 1
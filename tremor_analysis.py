@@ -0,0 +1,128 @@
+import math
+
+import numpy as np
+
+
+class TremorAnalyzer:
+    def __init__(self, sample_rate=60.0, window_seconds=2.0, band=(3.0, 12.0), max_gap=0.25):
+        """
+        Streaming tremor spectrum of the fingertip trace.
+
+        Samples arrive at the (variable) camera frame rate; they are linearly
+        resampled onto a uniform grid, differenced (removing the slow drawing
+        motion) and fed to a sliding DFT that only tracks the bins of the tremor
+        band, so each sample costs O(band bins) regardless of trace length.
+
+        Args:
+            sample_rate: uniform resampling rate in Hz
+            window_seconds: length of the sliding analysis window
+            band: (low, high) tremor band in Hz
+            max_gap: gaps longer than this (detection dropouts) are not interpolated
+        """
+        self.fs = float(sample_rate)
+        self.n = max(int(round(window_seconds * self.fs)), 8)
+        self.band = band
+        self.max_gap = max_gap
+
+        k_lo = max(int(math.ceil(band[0] * self.n / self.fs)), 1)
+        k_hi = min(int(math.floor(band[1] * self.n / self.fs)), self.n // 2 - 1)
+        # tracked bins include one neighbour on each side for the Hann window
+        self.bins = np.arange(k_lo - 1, k_hi + 2)
+        self.band_slice = slice(1, len(self.bins) - 1)
+        self.freqs = self.bins * self.fs / self.n
+        self._twiddle = np.exp(2j * np.pi * self.bins / self.n)
+        # converts the velocity spectrum back to position amplitude per bin
+        self._vel_to_pos = 1.0 / (2.0 * np.sin(np.pi * self.freqs[self.band_slice] / self.fs))
+        self.reset()
+
+    @classmethod
+    def from_config(cls, tremor_cfg):
+        return cls(
+            sample_rate=tremor_cfg.get("sample_rate", 60.0),
+            window_seconds=tremor_cfg.get("window_seconds", 2.0),
+            band=tuple(tremor_cfg.get("band", (3.0, 12.0))),
+        )
+
+    def reset(self):
+        self._window = np.zeros((self.n, 2))  # velocity samples (x, y), circular
+        self._spectrum = np.zeros((len(self.bins), 2), dtype=np.complex128)
+        self._pos = 0
+        self._pushed = 0
+        self._last_t = None
+        self._last_xy = None
+        self._next_t = None
+        self._prev_uniform = None
+
+    def add_sample(self, t, x, y):
+        """Feed one fingertip sample (seconds, pixels)."""
+        xy = np.array((x, y), dtype=np.float64)
+        if self._last_t is None or t - self._last_t > self.max_gap:
+            # first sample or after a dropout: restart the uniform grid here
+            self._last_t, self._last_xy = t, xy
+            self._next_t = t
+            self._prev_uniform = None
+        if t < self._next_t:
+            if t > self._last_t:
+                self._last_t, self._last_xy = t, xy
+            return
+        span = t - self._last_t
+        while self._next_t <= t:
+            a = 0.0 if span <= 0 else (self._next_t - self._last_t) / span
+            self._push_uniform(self._last_xy + a * (xy - self._last_xy))
+            self._next_t += 1.0 / self.fs
+        self._last_t, self._last_xy = t, xy
+
+    def _push_uniform(self, xy):
+        if self._prev_uniform is None:
+            self._prev_uniform = xy
+            return
+        v = xy - self._prev_uniform
+        self._prev_uniform = xy
+
+        old = self._window[self._pos].copy()
+        self._window[self._pos] = v
+        self._pos = (self._pos + 1) % self.n
+        self._pushed += 1
+        if self._pushed % self.n == 0:
+            self._resync()
+        else:
+            # sliding DFT: X_k <- (X_k + new - old) * e^{j 2 pi k / N}
+            self._spectrum = (self._spectrum + (v - old)[None, :]) * self._twiddle[:, None]
+
+    def _resync(self):
+        """Recompute the tracked bins exactly, once per window, to stop drift."""
+        ordered = np.roll(self._window, -self._pos, axis=0)  # oldest sample first
+        m = np.arange(self.n)
+        basis = np.exp(-2j * np.pi * np.outer(self.bins, m) / self.n)
+        self._spectrum = basis @ ordered
+
+    @property
+    def ready(self):
+        return self._pushed >= self.n
+
+    def result(self):
+        """
+        Current tremor estimate, or None until a full window has been seen.
+
+        Returns:
+            dict with dominant 'frequency' (Hz), its position 'amplitude' (px)
+            and 'band_power' (px^2 of position variance in the band)
+        """
+        if not self.ready:
+            return None
+        s = self._spectrum
+        hann = 0.5 * s[1:-1] - 0.25 * (s[:-2] + s[2:])
+        power = (np.abs(hann) ** 2).sum(axis=1) * self._vel_to_pos ** 2
+        band_power = float(power.sum() * 16.0 / (3.0 * self.n ** 2))
+
+        k = int(np.argmax(power))
+        offset = 0.0
+        if 0 < k < len(power) - 1:
+            # parabolic interpolation between neighbouring bins
+            left, mid, right = np.sqrt(power[k - 1:k + 2])
+            denom = left - 2 * mid + right
+            if denom != 0:
+                offset = 0.5 * (left - right) / denom
+        frequency = float(self.freqs[self.band_slice][k] + offset * self.fs / self.n)
+        amplitude = float(4.0 * np.sqrt(power[k]) / self.n)
+        return {"frequency": frequency, "amplitude": amplitude, "band_power": band_power}
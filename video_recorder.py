@@ -0,0 +1,184 @@
+"""
+Asynchronous session video recording.
+
+The frame loop copies each composed frame into a preallocated slot and hands
+the slot index to a background encoder thread, so cv2.VideoWriter.write never
+runs on the interactive loop. When every slot is in use the frame is either
+dropped (default) or the caller waits, depending on the policy.
+
+Next to the video a .csv sidecar lists (frame, t) for every written frame,
+with t on the same clock as the session log records.
+
+The codec is checked when the recorder is built, before the session starts.
+Should the writer still fail to open on the first frame, or encoding fail
+later (e.g. a full disk), recording is disabled with a warning instead of
+interrupting a running assessment.
+"""
+import os
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class VideoRecorder:
+    def __init__(self, path, fps=30.0, codec="mp4v", queue_size=32, policy="drop"):
+        """
+        Record frames to a video file from a background thread.
+
+        Args:
+            path: output video file
+            fps: nominal frame rate stored in the container
+            codec: FourCC code for cv2.VideoWriter
+            queue_size: number of frames that can wait for the encoder
+            policy: "drop" discards a frame when the queue is full, "block" waits
+
+        Raises:
+            RuntimeError: the codec cannot write to path
+        """
+        if policy not in ("drop", "block"):
+            raise ValueError(f"Unknown recording policy '{policy}', expected 'drop' or 'block'")
+        self.path = path
+        self.timestamps_path = os.path.splitext(path)[0] + ".csv"
+        self.fps = fps
+        self.codec = codec
+        self.policy = policy
+        self.queue_size = queue_size
+
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self.max_queue_depth = 0
+        self.blocked_seconds = 0.0
+        self.encode_seconds = 0.0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._slots = None  # (queue_size, h, w, 3) uint8, allocated on the first frame
+        self._free = queue.Queue()
+        self._pending = queue.Queue()
+        self._writer = None
+        self._thread = None
+        self.failed = False  # the writer could not be opened or encoding failed; frames are discarded
+        self._check_codec()
+
+    def _check_codec(self, size=(64, 64)):
+        """Open and discard a small writer so an unusable codec fails before the session."""
+        writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*self.codec), self.fps, size)
+        opened = writer.isOpened()
+        writer.release()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        if not opened:
+            raise RuntimeError(f"Could not open a '{self.codec}' video writer for {self.path}")
+
+    @classmethod
+    def from_config(cls, recording_cfg, path):
+        return cls(
+            path,
+            fps=recording_cfg.get("fps", 30.0),
+            codec=recording_cfg.get("codec", "mp4v"),
+            queue_size=recording_cfg.get("queue_size", 32),
+            policy=recording_cfg.get("policy", "drop"),
+        )
+
+    def _start(self, shape):
+        h, w = shape[:2]
+        self._writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*self.codec), self.fps, (w, h))
+        if not self._writer.isOpened():
+            self.failed = True
+            print(f"⚠️ Could not open video writer for {self.path} ({w}x{h}); recording disabled")
+            return
+        self._slots = np.empty((self.queue_size,) + shape, dtype=np.uint8)
+        for slot in range(self.queue_size):
+            self._free.put(slot)
+        self._thread = threading.Thread(target=self._encode_loop, daemon=True)
+        self._thread.start()
+
+    def write(self, frame, t):
+        """
+        Queue a copy of frame; returns False when it was dropped.
+
+        Args:
+            frame: BGR frame (every frame must have the same size)
+            t: timestamp written to the sidecar, e.g. GameLoop.frame_time
+        """
+        if self.failed:
+            self.frames_dropped += 1
+            return False
+        if self._slots is None:
+            self._start(frame.shape)
+            if self.failed:
+                self.frames_dropped += 1
+                return False
+        try:
+            slot = self._free.get_nowait()
+        except queue.Empty:
+            if self.policy == "drop":
+                self.frames_dropped += 1
+                return False
+            start = time.perf_counter()
+            slot = self._free.get()
+            self.blocked_seconds += time.perf_counter() - start
+        np.copyto(self._slots[slot], frame)
+        self._pending.put((slot, t))
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_size - self._free.qsize())
+        return True
+
+    def _encode_loop(self):
+        slot = None
+        try:
+            with open(self.timestamps_path, "w") as timestamps:
+                timestamps.write("frame,t\n")
+                while True:
+                    item = self._pending.get()
+                    if item is None:
+                        break
+                    slot, t = item
+                    start = time.perf_counter()
+                    self._writer.write(self._slots[slot])
+                    self.encode_seconds += time.perf_counter() - start
+                    self._free.put(slot)
+                    slot = None
+                    timestamps.write(f"{self.frames_written},{t:.6f}\n")
+                    self.frames_written += 1
+        except Exception as exc:  # e.g. disk full; the session itself must go on
+            self.failed = True
+            print(f"⚠️ Video recording failed ({exc}); recording disabled")
+            # hand every slot back so a blocked write() returns
+            if slot is not None:
+                self._free.put(slot)
+                self.frames_dropped += 1
+            self._discard_pending()
+
+    def _discard_pending(self):
+        while True:
+            try:
+                item = self._pending.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None:
+                self._free.put(item[0])
+                self.frames_dropped += 1
+
+    def stats(self):
+        return {
+            "frames_written": self.frames_written,
+            "frames_dropped": self.frames_dropped,
+            "max_queue_depth": self.max_queue_depth,
+            "blocked_seconds": self.blocked_seconds,
+            "encode_ms_per_frame": 1000.0 * self.encode_seconds / max(self.frames_written, 1),
+        }
+
+    def close(self):
+        """Encode everything still queued, then close the video and the sidecar."""
+        if self._thread is None:
+            return
+        self._pending.put(None)
+        self._thread.join()
+        if self.failed:
+            self._discard_pending()  # queued after the encoder stopped
+        self._writer.release()
+        self._thread = None